@@ -0,0 +1,49 @@
+from .sections import (
+    Section,
+    RectangularSection,
+    TrapezoidalSection,
+    TriangularSection,
+    CircularSection,
+    CompoundSection,
+)
+from .depths import normal_depth, critical_depth, critical_slope
+from .lookup import DepthLookup, depth_lookup
+from .gvf import GVFProfile, direct_step, standard_step, integrate_profile
+from .profiles import (
+    slope_class,
+    classify_profile,
+    classify_slopes,
+    ProfileFamily,
+    profile_family,
+    HydraulicJump,
+    locate_jump,
+)
+from .unsteady import RoutingResult, saint_venant, diffusive_wave
+
+__all__ = [
+    "Section",
+    "RectangularSection",
+    "TrapezoidalSection",
+    "TriangularSection",
+    "CircularSection",
+    "CompoundSection",
+    "normal_depth",
+    "critical_depth",
+    "critical_slope",
+    "DepthLookup",
+    "depth_lookup",
+    "GVFProfile",
+    "direct_step",
+    "standard_step",
+    "integrate_profile",
+    "slope_class",
+    "classify_profile",
+    "classify_slopes",
+    "ProfileFamily",
+    "profile_family",
+    "HydraulicJump",
+    "locate_jump",
+    "RoutingResult",
+    "saint_venant",
+    "diffusive_wave",
+]
@@ -0,0 +1,197 @@
+import numpy as np
+
+from .sections import Section
+
+__all__ = [
+    "normal_depth",
+    "critical_depth",
+    "critical_slope",
+]
+
+G = 9.81  # Gravity acceleration [m/s²]
+
+
+def _broadcast_shape(section: Section, *args):
+    # The section dimensions broadcast with each other through any property
+    return np.broadcast_shapes(np.shape(section.area(1.0)), *(np.shape(a) for a in args))
+
+
+def _bracket(residual, shape, upper, max_doublings: int = 64):
+    """Lower and upper depths with residual(lower) < 0 <= residual(upper)
+
+    The residuals go to -∞ as y → 0, so the lower end starts at zero. Where the
+    `upper` limit of the section is infinite, it is found by doubling a depth
+    of 1 m until the residual changes sign.
+    """
+    lo = np.zeros(shape)
+    hi = np.broadcast_to(np.asarray(upper, dtype=float), shape).copy()
+
+    open_top = ~np.isfinite(hi)
+    hi[open_top] = 1.0
+
+    for _ in range(max_doublings):
+        below = open_top & (residual(hi) < 0)
+        if not below.any():
+            break
+        lo = np.where(below, hi, lo)
+        hi = np.where(below, 2 * hi, hi)
+
+    return lo, hi, residual(hi) >= 0
+
+
+def _safeguarded_newton(residual, derivative, lo, hi, xtol: float, max_iter: int):
+    """Newton iterations kept inside a shrinking bracket, falling back to bisection
+
+    `residual` must increase with the depth and change sign within [lo, hi].
+    Every iteration either takes the Newton step, if it lands inside the
+    bracket, or bisects it, so the bracket always contains the root.
+    """
+    y = 0.5 * (lo + hi)
+    done = np.zeros(y.shape, dtype=bool)
+
+    for _ in range(max_iter):
+        f = residual(y)
+        below = f < 0
+        lo = np.where(below, y, lo)
+        hi = np.where(below, hi, y)
+
+        y_new = y - f / derivative(y)
+        inside = np.isfinite(y_new) & (y_new > lo) & (y_new < hi)
+        y_new = np.where(inside, y_new, 0.5 * (lo + hi))
+
+        done = done | (f == 0) | (np.abs(y_new - y) <= xtol * y) | (hi - lo <= xtol * hi)
+        y = np.where(done, y, y_new)
+
+        if done.all():
+            break
+
+    return y
+
+
+def normal_depth(
+    section: Section,
+    Q,
+    n,
+    S0,
+    k: float = 1.0,
+    xtol: float = 1e-12,
+    max_iter: int = 100,
+):
+    """Normal depth y_n satisfying Manning's equation Q = k/n · A R^(2/3) √S0
+
+    `Q`, `n`, `S0` and the section dimensions may be arrays that broadcast
+    together; every combination is solved at once. The residual
+    ln(A R^(2/3)) - ln(nQ / k√S0) increases with the depth up to
+    `section.max_conveyance_depth`, so the root is always bracketed. (A compound
+    section treated as a single unit may lose conveyance right above the banks;
+    the bracket then still converges, to one of the roots.)
+
+    Returns NaN where there is no normal depth: non-positive slopes, or
+    discharges above the capacity of a closed section. Use k = 1.49 for US units.
+    """
+    Q, n, S0 = (np.asarray(v, dtype=float) for v in (Q, n, S0))
+    shape = _broadcast_shape(section, Q, n, S0)
+
+    with np.errstate(all="ignore"):
+        log_target = np.log(n * Q / (k * np.sqrt(S0)))
+
+        def residual(y):
+            A = section.area(y)
+            P = section.wetted_perimeter(y)
+            return (5 / 3) * np.log(A) - (2 / 3) * np.log(P) - log_target
+
+        def derivative(y):
+            A_term = section.top_width(y) / section.area(y)
+            P_term = section.dP_dy(y) / section.wetted_perimeter(y)
+            return (5 / 3) * A_term - (2 / 3) * P_term
+
+        lo, hi, bracketed = _bracket(residual, shape, section.max_conveyance_depth)
+        y_n = _safeguarded_newton(residual, derivative, lo, hi, xtol, max_iter)
+
+    y_n = np.where(Q == 0, 0.0, y_n)
+    return np.where(bracketed | (Q == 0), y_n, np.nan)
+
+
+def critical_depth(
+    section: Section,
+    Q,
+    g: float = G,
+    xtol: float = 1e-12,
+    max_iter: int = 100,
+):
+    """Critical depth y_c satisfying Q²T / (gA³) = 1
+
+    `Q` and the section dimensions may be arrays that broadcast together. The
+    residual ln(A³/T) - ln(Q²/g) increases with the depth for every section in
+    `book.channels`, including circular conduits where T → 0 as the conduit
+    fills, so the root is always bracketed.
+    """
+    Q = np.asarray(Q, dtype=float)
+    shape = _broadcast_shape(section, Q)
+
+    with np.errstate(all="ignore"):
+        log_target = np.log(Q**2 / g)
+
+        def residual(y):
+            return 3 * np.log(section.area(y)) - np.log(section.top_width(y)) - log_target
+
+        def derivative(y):
+            T = section.top_width(y)
+            return 3 * T / section.area(y) - section.dT_dy(y) / T
+
+        lo, hi, bracketed = _bracket(residual, shape, section.max_depth)
+        y_c = _safeguarded_newton(residual, derivative, lo, hi, xtol, max_iter)
+
+    y_c = np.where(Q == 0, 0.0, y_c)
+    return np.where(bracketed | (Q == 0), y_c, np.nan)
+
+
+def critical_slope(section: Section, Q, n, k: float = 1.0, g: float = G):
+    """Bottom slope S_c at which the normal depth equals the critical depth"""
+    y_c = critical_depth(section, Q, g)
+    A = section.area(y_c)
+    R = section.hydraulic_radius(y_c)
+    return np.power(n * Q / (k * A * np.power(R, 2 / 3)), 2)
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    from .sections import CircularSection, TrapezoidalSection
+
+    rng = np.random.default_rng(340)
+    size = 100_000
+
+    ## A design table of random trapezoidal channels
+    Q = rng.uniform(0.5, 500.0, size)  # Discharge [m³/s]
+    b = rng.uniform(0.0, 30.0, size)  # Bottom width [m]
+    m = rng.uniform(0.0, 4.0, size)  # Side slope [-]
+    n = rng.uniform(0.010, 0.070, size)  # Manning coefficient [-]
+    S0 = np.power(10, rng.uniform(-5, -1, size))  # Bottom slope [-]
+    b[m == 0] += 0.1  # Avoid a zero-area section
+
+    section = TrapezoidalSection(b, m)
+
+    tic = perf_counter()
+    y_n = normal_depth(section, Q, n, S0)
+    elapsed_n = perf_counter() - tic
+
+    tic = perf_counter()
+    y_c = critical_depth(section, Q)
+    elapsed_c = perf_counter() - tic
+
+    Q_manning = section.area(y_n) * section.hydraulic_radius(y_n) ** (2 / 3) * np.sqrt(S0) / n
+    froude = Q / section.area(y_c) / np.sqrt(G * section.hydraulic_depth(y_c))
+
+    print(
+        f"y_n: {size:,} channels in {elapsed_n:.3f} s, max |ΔQ/Q| = {np.max(np.abs(Q_manning / Q - 1)):.1e}"
+    )
+    print(
+        f"y_c: {size:,} channels in {elapsed_c:.3f} s, max |Fr - 1| = {np.max(np.abs(froude - 1)):.1e}"
+    )
+
+    ## Circular conduits: no normal depth above the full-flow capacity
+    pipe = CircularSection(1.0)
+    Q_pipe = np.linspace(0.01, 3.0, 7)
+    print("Pipe y_n:", np.round(normal_depth(pipe, Q_pipe, 0.013, 0.01), 3))
+    print("Pipe y_c:", np.round(critical_depth(pipe, Q_pipe), 3))
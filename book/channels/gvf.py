@@ -0,0 +1,304 @@
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.optimize import brentq
+
+from .depths import G, critical_depth, normal_depth
+from .sections import Section
+
+__all__ = [
+    "specific_energy",
+    "specific_force",
+    "friction_slope",
+    "froude_number",
+    "gvf_slope",
+    "GVFProfile",
+    "direct_step",
+    "standard_step",
+    "integrate_profile",
+]
+
+
+def specific_energy(section: Section, Q, y, g: float = G):
+    """E = y + Q² / (2gA²)"""
+    return y + Q**2 / (2 * g * section.area(y) ** 2)
+
+
+def specific_force(section: Section, Q, y, g: float = G):
+    """M = A·ȳ + Q² / (gA), conserved across a hydraulic jump"""
+    return section.first_moment(y) + Q**2 / (g * section.area(y))
+
+
+def friction_slope(section: Section, Q, n, y, k: float = 1.0):
+    """Slope of the energy grade line from Manning's equation"""
+    return np.power(n * Q / (k * section.area(y) * section.hydraulic_radius(y) ** (2 / 3)), 2)
+
+
+def froude_number(section: Section, Q, y, g: float = G):
+    """Fr = V / √(g D_h)"""
+    A = section.area(y)
+    return Q / (A * np.sqrt(g * A / section.top_width(y)))
+
+
+def gvf_slope(section: Section, Q, n, S0, y, k: float = 1.0, g: float = G):
+    """dy/dx = (S0 - Sf) / (1 - Fr²), with x increasing downstream"""
+    A = section.area(y)
+    froude_sq = Q**2 * section.top_width(y) / (g * A**3)
+    return (S0 - friction_slope(section, Q, n, y, k)) / (1 - froude_sq)
+
+
+class GVFProfile:
+    """Depths `y` at stations `x` (increasing downstream) of a water surface profile
+
+    Calling the profile interpolates the depth at any station within its
+    range (NaN outside). Profiles from `integrate_profile` use the dense output
+    of the ODE solver instead. `event` tells why the computation stopped early,
+    e.g. "critical" if the profile reached critical depth. Profiles from
+    `standard_step` also have the `water_surface` elevation at every station
+    and flag in `choked` the stations set to critical depth; they are None
+    otherwise.
+    """
+
+    def __init__(
+        self,
+        x,
+        y,
+        method: str,
+        sol=None,
+        event: str | None = None,
+        water_surface=None,
+        choked=None,
+    ):
+        self.x = x
+        self.y = y
+        self.method = method
+        self.sol = sol
+        self.event = event
+        self.water_surface = water_surface
+        self.choked = choked
+
+    def __repr__(self):
+        return f"GVFProfile(method={self.method!r}, points={len(self.x)}, event={self.event!r})"
+
+    @property
+    def length(self):
+        return np.nanmax(self.x, axis=0) - np.nanmin(self.x, axis=0)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        lo, hi = np.nanmin(self.x), np.nanmax(self.x)
+
+        if self.sol is not None:
+            y = self.sol(np.clip(x, lo, hi))[0]
+        else:
+            order = np.argsort(self.x)
+            y = np.interp(x, self.x[order], self.y[order])
+
+        return np.where((x >= lo) & (x <= hi), y, np.nan)
+
+
+def direct_step(
+    section: Section,
+    Q,
+    n,
+    S0,
+    y_start,
+    y_end,
+    n_steps: int = 200,
+    x_start: float = 0.0,
+    k: float = 1.0,
+    g: float = G,
+    normal_tol: float = 1e-3,
+):
+    """Direct-step profile from depth `y_start` at `x_start` towards `y_end`
+
+    The depths are fixed in advance and the distance between consecutive
+    depths is Δx = ΔE / (S0 - S̄f), so every step is computed at once. `Q`, `n`,
+    `S0`, the section dimensions and the end depths may be arrays: the result
+    then has shape (n_steps + 1, ...) with one profile per column.
+
+    A profile cannot cross critical depth, and it only approaches the normal
+    depth asymptotically. The end depth is thus clipped at y_c, and stops
+    short of y_n by a fraction `normal_tol`.
+    """
+    Q, n, S0, y_start, y_end = (np.asarray(v, dtype=float) for v in (Q, n, S0, y_start, y_end))
+
+    y_c = critical_depth(section, Q, g)
+    with np.errstate(invalid="ignore"):
+        y_n = normal_depth(section, Q, n, S0, k)
+
+    ## Keep the end depth on the same side of y_c and y_n as the start depth
+    y_end = np.where((y_start - y_c) * (y_end - y_c) < 0, y_c, y_end)
+    crosses_normal = (y_start - y_n) * (y_end - y_n) <= 0
+    y_end = np.where(crosses_normal, y_n * (1 + normal_tol * np.sign(y_start - y_n)), y_end)
+
+    fraction = np.linspace(0.0, 1.0, n_steps + 1).reshape(-1, *([1] * np.ndim(y_end)))
+    y = y_start + (y_end - y_start) * fraction
+
+    E = specific_energy(section, Q, y, g)
+    Sf = friction_slope(section, Q, n, y, k)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dx = np.diff(E, axis=0) / (S0 - 0.5 * (Sf[1:] + Sf[:-1]))
+
+    x = x_start + np.concatenate([np.zeros_like(dx[:1]), np.cumsum(dx, axis=0)])
+    return GVFProfile(x, y, "direct-step")
+
+
+def standard_step(
+    sections,
+    stations,
+    bed_elevation,
+    Q: float,
+    n,
+    y_control: float,
+    regime: str = "subcritical",
+    k: float = 1.0,
+    g: float = G,
+):
+    """Standard-step profile over surveyed cross sections
+
+    `sections` is a list of `Section`, one per station; `stations` increase
+    downstream. Subcritical profiles are computed upstream from a control depth
+    at the last station, supercritical ones downstream from the first station.
+    Between stations the energy equation, with the average friction slope, is
+    solved for the unknown depth on its branch of the specific energy curve.
+    Where it has no solution the depth is set to critical and the station is
+    flagged in `profile.choked`, as HEC-RAS does.
+    """
+    stations = np.asarray(stations, dtype=float)
+    z = np.asarray(bed_elevation, dtype=float)
+    n = np.broadcast_to(np.asarray(n, dtype=float), stations.shape)
+
+    if regime == "subcritical":
+        order, direction = np.arange(len(stations))[::-1], 1.0  # Energy grows upstream
+    elif regime == "supercritical":
+        order, direction = np.arange(len(stations)), -1.0  # Energy drops downstream
+    else:
+        raise ValueError(f"Unknown regime {regime!r}, use 'subcritical' or 'supercritical'")
+
+    y = np.full(len(stations), np.nan)
+    choked = np.zeros(len(stations), dtype=bool)
+    y[order[0]] = y_control
+
+    for i, j in zip(order[:-1], order[1:]):
+        section = sections[j]
+        dx = abs(stations[j] - stations[i])
+        Sf_i = friction_slope(sections[i], Q, n[i], y[i], k)
+        H_i = z[i] + specific_energy(sections[i], Q, y[i], g)
+
+        def energy_balance(y_j):
+            Sf_j = friction_slope(section, Q, n[j], y_j, k)
+            H_j = z[j] + specific_energy(section, Q, y_j, g)
+            return H_j - H_i - direction * dx * 0.5 * (Sf_i + Sf_j)
+
+        y_c = float(critical_depth(section, Q, g))
+
+        ## Bracket the root on the branch of the flow regime
+        if regime == "subcritical":
+            lo, hi = y_c, 2 * max(y_c, y[i])
+            while energy_balance(hi) < 0 and hi < 1e6:
+                hi *= 2
+        else:
+            lo, hi = 1e-6 * y_c, y_c
+
+        if energy_balance(lo) * energy_balance(hi) <= 0:
+            y[j] = brentq(energy_balance, lo, hi, xtol=1e-10)
+        else:
+            y[j], choked[j] = y_c, True
+
+    return GVFProfile(stations, y, "standard-step", water_surface=z + y, choked=choked)
+
+
+def integrate_profile(
+    section: Section,
+    Q: float,
+    n: float,
+    S0: float,
+    y0: float,
+    x_span: tuple[float, float],
+    k: float = 1.0,
+    g: float = G,
+    critical_tol: float = 0.02,
+    method: str = "RK45",
+    rtol: float = 1e-8,
+    atol: float = 1e-10,
+):
+    """Adaptive ODE integration of dy/dx from y(x_span[0]) = y0 with dense output
+
+    `x_span` may run upstream (decreasing x) or downstream. Integration stops
+    before the singularity at critical depth, when the squared Froude number
+    comes within `critical_tol` of one (`profile.event == "critical"`), or if
+    the channel runs dry (`"dry"`).
+    """
+    side = np.sign(1 - froude_number(section, Q, y0, g) ** 2)  # +1 subcritical start
+
+    def rhs(x, y):
+        return gvf_slope(section, Q, n, S0, y, k, g)
+
+    def near_critical(x, y):
+        return side * (1 - froude_number(section, Q, y[0], g) ** 2) - critical_tol
+
+    def dry(x, y):
+        return y[0] - 1e-6
+
+    near_critical.terminal = True
+    dry.terminal = True
+
+    with np.errstate(all="ignore"):
+        solution = solve_ivp(
+            rhs,
+            x_span,
+            [y0],
+            method=method,
+            rtol=rtol,
+            atol=atol,
+            dense_output=True,
+            events=[near_critical, dry],
+        )
+
+    event = None
+    if solution.status == 1:
+        event = "critical" if len(solution.t_events[0]) else "dry"
+
+    return GVFProfile(solution.t, solution.y[0], "ode", sol=solution.sol, event=event)
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    from .sections import TrapezoidalSection
+
+    section = TrapezoidalSection(4.0, 1.0)
+    Q, n, S0 = 12.5, 0.025, 0.0005  # Mild slope
+    y_n = float(normal_depth(section, Q, n, S0))
+
+    ## M1 backwater curve upstream of a 4 m deep pool, over tens of kilometers
+    tic = perf_counter()
+    profile = direct_step(section, Q, n, S0, 4.0, y_n, n_steps=2000)
+    elapsed = perf_counter() - tic
+    print(f"Direct step: {-profile.x[-1] / 1e3:.1f} km in {1e3 * elapsed:.2f} ms")
+
+    tic = perf_counter()
+    ode = integrate_profile(section, Q, n, S0, 4.0, (0.0, profile.x[-1]))
+    elapsed = perf_counter() - tic
+    difference = np.nanmax(np.abs(ode(profile.x) - profile.y))
+    print(
+        f"Adaptive ODE: {len(ode.x)} steps in {1e3 * elapsed:.1f} ms, max |Δy| = {difference:.1e} m"
+    )
+
+    ## 500 direct-step profiles at once
+    pools = np.linspace(2.0, 6.0, 500)
+    tic = perf_counter()
+    direct_step(section, Q, n, S0, pools, y_n, n_steps=2000)
+    print(f"500 direct-step profiles in {1e3 * (perf_counter() - tic):.1f} ms")
+
+    ## Standard step over 400 surveyed sections of a 20 km reach
+    stations = np.linspace(0.0, 20_000.0, 400)
+    rng = np.random.default_rng(340)
+    surveyed = [TrapezoidalSection(b, 1.0) for b in rng.uniform(3.5, 4.5, len(stations))]
+    bed = S0 * (stations[-1] - stations)
+
+    tic = perf_counter()
+    standard = standard_step(surveyed, stations, bed, Q, n, 4.0)
+    elapsed = perf_counter() - tic
+    print(f"Standard step: {len(stations)} sections in {1e3 * elapsed:.1f} ms")
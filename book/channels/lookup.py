@@ -0,0 +1,230 @@
+import numpy as np
+import os
+import tempfile
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from scipy.interpolate import CubicSpline, RectBivariateSpline
+
+from .depths import G, critical_depth, normal_depth
+from .sections import TrapezoidalSection
+
+__all__ = [
+    "DepthLookup",
+    "depth_lookup",
+]
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "civenv340"
+TABLE_VERSION = 1  # Bump when the grids below change
+POLISH_TOL = 1e-4  # Largest relative Newton correction trusted to reach full precision
+
+
+def _critical_group(eta):
+    # Q·m^1.5 / (g^0.5 b^2.5) as a function of η = m·y_c / b
+    return np.power(eta * (1 + eta), 1.5) / np.sqrt(1 + 2 * eta)
+
+
+def _manning_group(xi, m):
+    # Q·n / (k √S0 b^(8/3)) as a function of ξ = y_n / b
+    return np.power(xi * (1 + m * xi), 5 / 3) / np.power(1 + 2 * xi * np.sqrt(1 + m**2), 2 / 3)
+
+
+def build_tables(
+    eta=np.geomspace(1e-6, 1e4, 2001),
+    xi=np.geomspace(1e-5, 1e3, 1601),
+    m=10.0 * np.linspace(0.0, 1.0, 61) ** 2,
+    n_groups: int = 801,
+):
+    """Dimensionless critical and normal depths of trapezoidal sections
+
+    The critical depth table maps log(Q·m^1.5 / g^0.5 b^2.5) to log(m·y_c / b).
+    The Manning table depends on the side slope too, so it maps
+    (m, log(Q·n / k√S0 b^(8/3))) to log(y_n / b). The side slopes are denser
+    near m = 0, where the table changes fastest.
+    """
+    log_critical = np.log(_critical_group(eta))
+
+    log_manning = np.log(_manning_group(xi[:, None], m[None, :]))  # (ξ, m)
+    groups = np.linspace(log_manning[0].max(), log_manning[-1].min(), n_groups)
+    log_xi = np.stack([np.interp(groups, log_manning[:, j], np.log(xi)) for j in range(len(m))])
+
+    return {
+        "critical_group": log_critical,
+        "critical_depth": np.log(eta),
+        "manning_slope": m,
+        "manning_group": groups,
+        "manning_depth": log_xi,
+    }
+
+
+class DepthLookup:
+    """Critical and normal depths of trapezoidal channels from precomputed tables
+
+    A spline through the dimensionless table gives a first estimate, and one
+    Newton step on the exact equation polishes it. Inputs outside the tables
+    (very large side slopes or extreme discharges), or where the Newton
+    correction is too large to trust, fall back to the bracketed solvers.
+    """
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self._critical = CubicSpline(tables["critical_group"], tables["critical_depth"])
+        self._manning = RectBivariateSpline(
+            tables["manning_slope"], tables["manning_group"], tables["manning_depth"]
+        )
+
+    @classmethod
+    def load(cls, cache_dir: str | Path | None = None):
+        """Read the tables from `cache_dir`, building and saving them on the first call
+
+        The tables are written to a temporary file and renamed into place, so
+        concurrent sessions never read a partial file. An unreadable file is
+        rebuilt.
+        """
+        path = Path(cache_dir or CACHE_DIR) / f"depth_lookup_v{TABLE_VERSION}.npz"
+
+        try:
+            with np.load(path) as npz:
+                return cls(dict(npz))
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            pass  # Missing or corrupt file, (re)written below
+
+        tables = build_tables()
+        scratch = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".npz", delete=False) as f:
+                scratch = f.name
+                np.savez(f, **tables)
+            os.replace(scratch, path)
+        except OSError:
+            if scratch is not None:
+                Path(scratch).unlink(missing_ok=True)
+            # A read-only disk only costs rebuilding the tables
+
+        return cls(tables)
+
+    def critical_depth(self, Q, b, m, g: float = G):
+        """Critical depth y_c [m] of a trapezoidal section"""
+        Q, b, m = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (Q, b, m)))
+        section = TrapezoidalSection(b, m)
+
+        with np.errstate(all="ignore"):
+            log_group = np.log(Q * np.power(m, 1.5) / (np.sqrt(g) * np.power(b, 2.5)))
+            y = b / m * np.exp(self._critical(log_group))
+
+            ## Rectangular and triangular sections have closed forms
+            y = np.where(m == 0, np.cbrt(Q**2 / (g * b**2)), y)
+            y = np.where(b == 0, np.power(2 * Q**2 / (g * m**2), 0.2), y)
+
+            ## One Newton step on ln(A³/T) - ln(Q²/g)
+            A, T = section.area(y), section.top_width(y)
+            f = 3 * np.log(A) - np.log(T) - np.log(Q**2 / g)
+            step = f / (3 * T / A - section.dT_dy(y) / T)
+            y = y - step
+
+        outside = (
+            (m > 0)
+            & (b > 0)
+            & (
+                (log_group < self.tables["critical_group"][0])
+                | (log_group > self.tables["critical_group"][-1])
+            )
+        )
+        outside |= ~(np.abs(step) < POLISH_TOL * y) & (Q > 0)
+
+        return self._fallback(y, outside, critical_depth, Q, b, m, g=g)
+
+    def normal_depth(self, Q, b, m, n, S0, k: float = 1.0):
+        """Normal depth y_n [m] of a trapezoidal section"""
+        Q, b, m, n, S0 = np.broadcast_arrays(
+            *(np.asarray(v, dtype=float) for v in (Q, b, m, n, S0))
+        )
+        section = TrapezoidalSection(b, m)
+
+        with np.errstate(all="ignore"):
+            target = n * Q / (k * np.sqrt(S0))
+            log_group = np.log(target / np.power(b, 8 / 3))
+            y = b * np.exp(self._manning.ev(m, log_group))
+
+            ## Triangular sections have a closed form
+            y_triangle = np.power(
+                target * np.power(2 * np.sqrt(1 + m**2), 2 / 3) / m ** (5 / 3), 3 / 8
+            )
+            y = np.where(b == 0, y_triangle, y)
+
+            ## One Newton step on ln(A R^(2/3)) - ln(nQ / k√S0)
+            A, P = section.area(y), section.wetted_perimeter(y)
+            f = (5 / 3) * np.log(A) - (2 / 3) * np.log(P) - np.log(target)
+            step = f / ((5 / 3) * section.top_width(y) / A - (2 / 3) * section.dP_dy(y) / P)
+            y = y - step
+
+        groups = self.tables["manning_group"]
+        outside = (b > 0) & (
+            (m > self.tables["manning_slope"][-1])
+            | (log_group < groups[0])
+            | (log_group > groups[-1])
+        )
+        outside |= ~(np.abs(step) < POLISH_TOL * y) & (Q > 0) & (S0 > 0)
+
+        return self._fallback(y, outside, normal_depth, Q, b, m, n, S0, k=k)
+
+    @staticmethod
+    def _fallback(y, outside, solver, Q, b, m, *args, **kwargs):
+        y = np.where(Q == 0, 0.0, y)
+        if outside.any():
+            section = TrapezoidalSection(b[outside], m[outside])
+            y[outside] = solver(section, Q[outside], *(a[outside] for a in args), **kwargs)
+        return y if y.ndim else y.item()
+
+
+@lru_cache
+def depth_lookup(cache_dir: str | None = None) -> DepthLookup:
+    """Shared `DepthLookup`, loaded once per process"""
+    return DepthLookup.load(cache_dir)
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    tic = perf_counter()
+    lookup = DepthLookup(build_tables())
+    print(f"Tables built in {1e3 * (perf_counter() - tic):.1f} ms")
+
+    ## A single slider update
+    tic = perf_counter()
+    for _ in range(1000):
+        lookup.critical_depth(20.0, 5.0, 2.0)
+    print(f"Single y_c: {1e3 * (perf_counter() - tic):.1f} µs")
+
+    tic = perf_counter()
+    for _ in range(1000):
+        critical_depth(TrapezoidalSection(5.0, 2.0), 20.0)
+    print(f"Single y_c (bracketed solver): {1e3 * (perf_counter() - tic):.1f} µs")
+
+    ## Sweeping a parameter space
+    rng = np.random.default_rng(340)
+    size = 1_000_000
+    Q = rng.uniform(0.5, 500.0, size)  # Discharge [m³/s]
+    b = rng.uniform(0.5, 50.0, size)  # Bottom width [m]
+    m = rng.uniform(0.0, 10.0, size)  # Side slope [-]
+    n = rng.uniform(0.010, 0.070, size)  # Manning coefficient [-]
+    S0 = np.power(10, rng.uniform(-5, -1, size))  # Bottom slope [-]
+
+    for name, lookup_solver, exact_solver, args in [
+        ("y_c", lookup.critical_depth, critical_depth, (Q,)),
+        ("y_n", lookup.normal_depth, normal_depth, (Q, n, S0)),
+    ]:
+        tic = perf_counter()
+        y = lookup_solver(Q, b, m, *args[1:])
+        elapsed = perf_counter() - tic
+
+        tic = perf_counter()
+        y_exact = exact_solver(TrapezoidalSection(b, m), *args)
+        elapsed_exact = perf_counter() - tic
+
+        error = np.max(np.abs(y / y_exact - 1))
+        print(
+            f"{name}: {size:,} channels in {elapsed:.3f} s "
+            f"(bracketed solver {elapsed_exact:.3f} s), max relative error {error:.1e}"
+        )
@@ -0,0 +1,310 @@
+import numpy as np
+
+from .depths import G, critical_depth, normal_depth
+from .gvf import direct_step, friction_slope, froude_number, specific_force
+from .sections import Section
+
+__all__ = [
+    "slope_class",
+    "classify_profile",
+    "classify_slopes",
+    "ProfileFamily",
+    "profile_family",
+    "HydraulicJump",
+    "locate_jump",
+]
+
+
+def slope_class(y_n, y_c, S0=None, rtol: float = 1e-3):
+    """Channel slope class: Mild, Critical, Steep, Horizontal or Adverse
+
+    Without `S0`, the slope is assumed positive (bottom dropping downstream)
+    and only M, C and S are possible. Works element-wise on arrays.
+    """
+    y_n, y_c = np.broadcast_arrays(np.asarray(y_n, dtype=float), np.asarray(y_c, dtype=float))
+    kind = np.where(y_n > y_c, "M", "S")
+    kind = np.where(np.abs(y_n - y_c) <= rtol * y_c, "C", kind)
+
+    if S0 is not None:
+        S0 = np.asarray(S0, dtype=float)
+        kind = np.where(S0 == 0, "H", np.where(S0 < 0, "A", kind))
+
+    return kind
+
+
+def classify_profile(y, y_n, y_c, S0=None, rtol: float = 1e-3):
+    """Name of the water surface profile through depth `y`, e.g. "M1" or "S2"
+
+    The zone is 1 above both y_n and y_c, 2 between them and 3 below both.
+    Horizontal and adverse channels have no normal depth, so their profiles
+    are H2/A2 above y_c and H3/A3 below; critical channels give C1 or C3.
+    """
+    y, y_n, y_c = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (y, y_n, y_c)))
+    kind = slope_class(y_n, y_c, S0, rtol)
+
+    upper, lower = np.fmax(y_n, y_c), np.fmin(y_n, y_c)
+    zone = np.where(y > upper, "1", np.where(y > lower, "2", "3"))
+
+    no_normal_depth = (kind == "H") | (kind == "A")
+    zone = np.where(no_normal_depth, np.where(y > y_c, "2", "3"), zone)
+    zone = np.where(kind == "C", np.where(y > y_c, "1", "3"), zone)
+
+    return np.char.add(kind, zone)
+
+
+def classify_slopes(section: Section, Q, n, S0, y, k: float = 1.0, g: float = G):
+    """Profile types, normal and critical depths through depth `y` for many slopes at once"""
+    y_c = critical_depth(section, Q, g)
+    with np.errstate(invalid="ignore"):
+        y_n = normal_depth(section, Q, n, S0, k)
+    return classify_profile(y, y_n, y_c, S0), y_n, y_c
+
+
+def _resample(x, y, stations, beyond):
+    """Interpolate the columns of direct-step profiles onto common stations
+
+    Stations past the end of a profile get the depth in `beyond`, and stations
+    behind its start are NaN.
+    """
+    depth = np.empty((y.shape[1], len(stations)))
+    for i in range(y.shape[1]):
+        valid = np.isfinite(x[:, i])
+        xi, yi = x[valid, i], y[valid, i]
+        if xi[-1] >= xi[0]:
+            depth[i] = np.interp(stations, xi, yi, left=np.nan, right=beyond[i])
+        else:
+            depth[i] = np.interp(stations, xi[::-1], yi[::-1], left=beyond[i], right=np.nan)
+    return depth
+
+
+def _end_depth(profiles, y_n, y_c):
+    # A profile that stopped at critical depth ends there; otherwise it tends to normal depth
+    return np.where(np.isclose(profiles.y[-1], y_c), y_c, y_n)
+
+
+def _target_depth(section, Q, n, S0, y_start, y_n, y_c, length: float, k: float, g: float):
+    """Depth that a direct-step profile marches to, away from its control
+
+    Subcritical profiles run upstream and supercritical ones downstream,
+    towards normal depth (`direct_step` clips the target at critical depth).
+    Subcritical profiles of horizontal and adverse channels have no normal
+    depth and rise upstream without bound. Both Sf and Fr decrease with the
+    depth, so the depth rises at most at the rate (Sf - S0) / (1 - Fr²) of the
+    control; the target is twice that rise over `length`, so that the profile
+    spans the whole reach.
+    """
+    with np.errstate(all="ignore"):
+        rate = (friction_slope(section, Q, n, y_start, k) - S0) / (
+            1 - froude_number(section, Q, y_start, g) ** 2
+        )
+    rising = y_start + 2 * length * rate
+    return np.where(np.isfinite(y_n), y_n, np.where(y_start > y_c, rising, y_c))
+
+
+class ProfileFamily:
+    """Water surface profiles for many discharges on a common grid of stations
+
+    `depth[i, j]` is the depth of the profile for `Q[i]` at a distance
+    `stations[j]` from its control section. Subcritical profiles run upstream
+    from a downstream control, supercritical ones downstream from an upstream
+    control. Profiles that end at critical depth before the end of the reach
+    are NaN beyond that point. `S0` gives the H and A types of horizontal and
+    adverse channels, which have no normal depth.
+    """
+
+    def __init__(self, Q, stations, depth, y_boundary, y_n, y_c, S0=None):
+        self.Q = Q
+        self.stations = stations
+        self.depth = depth
+        self.y_boundary = y_boundary
+        self.y_n = y_n
+        self.y_c = y_c
+        self.types = classify_profile(y_boundary, y_n, y_c, S0)
+
+    @property
+    def subcritical(self):
+        return self.y_boundary > self.y_c
+
+    def to_frame(self):
+        """Depths as a (stations × flows) table, one column per discharge"""
+        import pandas as pd
+
+        return pd.DataFrame(
+            self.depth.T,
+            index=pd.Index(self.stations, name="Distance from control [m]"),
+            columns=pd.Index(self.Q, name="Q [m³/s]"),
+        )
+
+
+def profile_family(
+    section: Section,
+    Q,
+    n,
+    S0,
+    y_boundary,
+    length: float,
+    n_stations: int = 201,
+    n_steps: int = 400,
+    k: float = 1.0,
+    g: float = G,
+):
+    """Profiles for every discharge in `Q` with control depths `y_boundary`
+
+    All profiles are computed at once by the direct-step method, marching from
+    the control towards normal depth, and then interpolated onto `n_stations`
+    evenly spaced stations over `length`. Beyond the point where a profile is
+    within 0.1% of normal depth, it is taken as uniform flow. `S0` is positive
+    for a channel bottom that drops downstream; on horizontal and adverse
+    channels, profiles run towards critical depth instead.
+    """
+    Q, y_boundary = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(Q, dtype=float)), np.asarray(y_boundary, dtype=float)
+    )
+
+    y_c = critical_depth(section, Q, g)
+    with np.errstate(invalid="ignore"):
+        y_n = normal_depth(section, Q, n, S0, k)
+
+    y_target = _target_depth(section, Q, n, S0, y_boundary, y_n, y_c, length, k, g)
+    profiles = direct_step(section, Q, n, S0, y_boundary, y_target, n_steps=n_steps, k=k, g=g)
+
+    ## Distance from the control: upstream for subcritical profiles, downstream otherwise
+    distance = np.where(y_boundary > y_c, -profiles.x, profiles.x)
+    stations = np.linspace(0.0, length, n_stations)
+
+    ## Profiles that reach critical depth end there (NaN); the others continue at normal depth
+    end = _end_depth(profiles, y_n, y_c)
+    depth = _resample(distance, profiles.y, stations, np.where(end == y_c, np.nan, end))
+
+    return ProfileFamily(Q, stations, depth, y_boundary, y_n, y_c, S0)
+
+
+class HydraulicJump:
+    """Supercritical and subcritical profiles of a reach and the jump between them
+
+    `x` is the jump location (NaN if there is no jump within the reach),
+    `y1` and `y2` the conjugate depths. `location` is "reach" if the jump
+    occurs within the reach, "upstream" if the subcritical flow drowns the
+    upstream control, "downstream" if the flow leaves the reach supercritical,
+    or "undetermined" if the profiles could not be compared (then `x`, `y1`
+    and `y2` are NaN).
+    """
+
+    def __init__(self, stations, y_super, y_sub, x, y1, y2, location):
+        self.stations = stations
+        self.y_super = y_super
+        self.y_sub = y_sub
+        self.x = x
+        self.y1 = y1
+        self.y2 = y2
+        self.location = location
+
+    @property
+    def depth(self):
+        """Depth along the reach: supercritical upstream of the jump, subcritical downstream"""
+        x_jump = np.select(
+            [self.location == "upstream", self.location == "downstream"], [-np.inf, np.inf], self.x
+        )
+        return np.where(self.stations < x_jump[:, None], self.y_super, self.y_sub)
+
+
+def locate_jump(
+    section: Section,
+    Q,
+    n,
+    S0,
+    y_upstream,
+    y_downstream,
+    length: float,
+    n_stations: int = 1001,
+    n_steps: int = 400,
+    k: float = 1.0,
+    g: float = G,
+):
+    """Locate the hydraulic jump between a supercritical and a subcritical control
+
+    The supercritical profile is computed downstream from `y_upstream` at x = 0
+    and the subcritical one upstream from `y_downstream` at x = `length`. The
+    jump is where both profiles have the same specific force. `Q`, `S0`, the
+    controls and the section dimensions may be arrays, e.g. to sweep slopes.
+    """
+    Q, S0, y_upstream, y_downstream = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (Q, S0, y_upstream, y_downstream))
+    )
+    stations = np.linspace(0.0, length, n_stations)
+
+    y_c = critical_depth(section, Q, g)
+    with np.errstate(invalid="ignore"):
+        y_n = normal_depth(section, Q, n, S0, k)
+
+    y_target = _target_depth(section, Q, n, S0, y_upstream, y_n, y_c, length, k, g)
+    supercritical = direct_step(section, Q, n, S0, y_upstream, y_target, n_steps, 0.0, k, g)
+    y_target = _target_depth(section, Q, n, S0, y_downstream, y_n, y_c, length, k, g)
+    subcritical = direct_step(section, Q, n, S0, y_downstream, y_target, n_steps, length, k, g)
+
+    y_super = _resample(
+        supercritical.x, supercritical.y, stations, _end_depth(supercritical, y_n, y_c)
+    )
+    y_sub = _resample(subcritical.x, subcritical.y, stations, _end_depth(subcritical, y_n, y_c))
+
+    ## The supercritical flow carries more specific force until the jump
+    M_super = specific_force(section, Q[:, None], y_super, g)
+    M_sub = specific_force(section, Q[:, None], y_sub, g)
+    excess = M_super - M_sub
+
+    crossed = excess <= 0
+    j = np.argmax(crossed, axis=1)
+    rows = np.arange(len(Q))
+
+    location = np.where(
+        crossed[:, 0], "upstream", np.where(crossed.any(axis=1), "reach", "downstream")
+    )
+
+    ## Linear interpolation of the crossing between stations j - 1 and j
+    i = np.maximum(j - 1, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w = excess[rows, i] / (excess[rows, i] - excess[rows, j])
+    w = np.where(j > 0, w, 0.0)
+
+    def at_jump(values):
+        interpolated = values[rows, i] + w * (values[rows, j] - values[rows, i])
+        return np.where(location == "reach", interpolated, np.nan)
+
+    x, y1, y2 = at_jump(np.broadcast_to(stations, y_super.shape)), at_jump(y_super), at_jump(y_sub)
+
+    ## Specific forces that never match, e.g. a profile that could not be computed
+    undetermined = (location == "reach") & ~np.isfinite(x + y1 + y2)
+    undetermined |= (location == "downstream") & np.isnan(excess).any(axis=1)
+    location = np.where(undetermined, "undetermined", location)
+
+    return HydraulicJump(stations, y_super, y_sub, x, y1, y2, location)
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    from .sections import RectangularSection, TrapezoidalSection
+
+    section = TrapezoidalSection(10.0, 2.0)
+    Q = np.linspace(5.0, 500.0, 50)  # Discharge [m³/s]
+    pool = 1.5 * normal_depth(section, Q, 0.035, 0.0005)  # Downstream control [m]
+
+    tic = perf_counter()
+    family = profile_family(section, Q, 0.035, 0.0005, pool, length=30_000)
+    elapsed = perf_counter() - tic
+
+    print(f"{len(Q)} profiles × {len(family.stations)} stations in {1e3 * elapsed:.1f} ms")
+    print("Types:", dict(zip(*np.unique(family.types, return_counts=True))))
+
+    ## Jump below a sluice gate, for hundreds of slopes
+    channel = RectangularSection(3.0)
+    slopes = np.linspace(-0.002, 0.02, 500)
+
+    tic = perf_counter()
+    types, _, _ = classify_slopes(channel, 10.0, 0.015, slopes, 0.3)
+    jump = locate_jump(channel, 10.0, 0.015, slopes, 0.3, 2.0, length=200.0)
+    elapsed = perf_counter() - tic
+
+    print(f"{len(slopes)} slopes classified, jumps located in {1e3 * elapsed:.1f} ms")
+    print("Gate profiles:", dict(zip(*np.unique(types, return_counts=True))))
+    print("Jump location:", dict(zip(*np.unique(jump.location, return_counts=True))))
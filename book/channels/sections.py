@@ -0,0 +1,238 @@
+import numpy as np
+from abc import ABC, abstractmethod
+
+__all__ = [
+    "Section",
+    "RectangularSection",
+    "TrapezoidalSection",
+    "TriangularSection",
+    "CircularSection",
+    "CompoundSection",
+]
+
+
+class Section(ABC):
+    """Geometry of an open-channel cross section as a function of the flow depth
+
+    Every method takes a depth `y` (scalar or array) and is vectorized with NumPy.
+    Section dimensions may also be arrays, as long as they broadcast with `y`.
+    """
+
+    max_depth = np.inf  # Depth at which the section is full [m]
+    max_conveyance_depth = np.inf  # Depth above which the conveyance decreases [m]
+
+    @abstractmethod
+    def area(self, y):
+        """Flow area A(y)"""
+
+    @abstractmethod
+    def wetted_perimeter(self, y):
+        """Wetted perimeter P(y)"""
+
+    @abstractmethod
+    def top_width(self, y):
+        """Top width T(y)"""
+
+    @abstractmethod
+    def first_moment(self, y):
+        """First moment of the flow area about the free surface, A·ȳ (= ∫A dy)"""
+
+    @abstractmethod
+    def dP_dy(self, y):
+        """Derivative of the wetted perimeter with respect to the depth"""
+
+    @abstractmethod
+    def dT_dy(self, y):
+        """Derivative of the top width with respect to the depth"""
+
+    def dA_dy(self, y):
+        """Derivative of the flow area with respect to the depth, equal to T(y)"""
+        return self.top_width(y)
+
+    def hydraulic_radius(self, y):
+        """Hydraulic radius R = A/P"""
+        return self.area(y) / self.wetted_perimeter(y)
+
+    def hydraulic_depth(self, y):
+        """Hydraulic depth D = A/T"""
+        return self.area(y) / self.top_width(y)
+
+
+class RectangularSection(Section):
+    def __init__(self, b):
+        self.b = np.asarray(b, dtype=float)  # Bottom width [m]
+
+    def area(self, y):
+        return self.b * y
+
+    def wetted_perimeter(self, y):
+        return self.b + 2 * y
+
+    def top_width(self, y):
+        return self.b + 0 * y
+
+    def first_moment(self, y):
+        return 0.5 * self.b * y**2
+
+    def dP_dy(self, y):
+        return 2.0 + 0 * y
+
+    def dT_dy(self, y):
+        return 0.0 * y
+
+
+class TrapezoidalSection(Section):
+    def __init__(self, b, m):
+        self.b = np.asarray(b, dtype=float)  # Bottom width [m]
+        self.m = np.asarray(m, dtype=float)  # Side slope, horizontal:vertical [-]
+
+        self._sqrt_1m2 = np.sqrt(1 + self.m**2)  # Slant length per unit depth
+
+    def area(self, y):
+        return (self.b + self.m * y) * y
+
+    def wetted_perimeter(self, y):
+        return self.b + 2 * y * self._sqrt_1m2
+
+    def top_width(self, y):
+        return self.b + 2 * self.m * y
+
+    def first_moment(self, y):
+        return self.b * y**2 / 2 + self.m * y**3 / 3
+
+    def dP_dy(self, y):
+        return 2 * self._sqrt_1m2 + 0 * y
+
+    def dT_dy(self, y):
+        return 2 * self.m + 0 * y
+
+
+class TriangularSection(TrapezoidalSection):
+    def __init__(self, m):
+        super().__init__(0.0, m)
+
+
+class CircularSection(Section):
+    """Partially full circular conduit of diameter D"""
+
+    def __init__(self, D):
+        self.D = np.asarray(D, dtype=float)  # Diameter [m]
+        self.max_depth = self.D
+        self.max_conveyance_depth = 0.9382 * self.D  # Maximum of A·R^(2/3)
+
+        self._r = self.D / 2
+
+    def _half_angle(self, y):
+        # α is half the angle subtended by the free surface at the center
+        return np.arccos(np.clip(1 - y / self._r, -1.0, 1.0))
+
+    def area(self, y):
+        a = self._half_angle(y)
+        return self._r**2 * (a - np.sin(a) * np.cos(a))
+
+    def wetted_perimeter(self, y):
+        return 2 * self._r * self._half_angle(y)
+
+    def top_width(self, y):
+        return 2 * self._r * np.sin(self._half_angle(y))
+
+    def first_moment(self, y):
+        a = self._half_angle(y)
+        sin_a = np.sin(a)
+        return self._r**3 * (sin_a - a * np.cos(a) - sin_a**3 / 3)
+
+    def dP_dy(self, y):
+        with np.errstate(divide="ignore"):
+            return 2.0 / np.sin(self._half_angle(y))
+
+    def dT_dy(self, y):
+        a = self._half_angle(y)
+        with np.errstate(divide="ignore"):
+            return 2.0 * np.cos(a) / np.sin(a)
+
+
+class CompoundSection(Section):
+    """Trapezoidal main channel with symmetric floodplains
+
+    Above the bank height `h`, each floodplain adds a horizontal width `Bf` and
+    rises with side slope `mf`. The whole section is treated as a single unit,
+    so the hydraulic radius is the one of the combined area and perimeter.
+    """
+
+    def __init__(self, b, m, h, Bf, mf):
+        self.main = TrapezoidalSection(b, m)
+        self.h = np.asarray(h, dtype=float)  # Bank height [m]
+        self.Bf = np.asarray(Bf, dtype=float)  # Width of each floodplain [m]
+        self.mf = np.asarray(mf, dtype=float)  # Floodplain side slope [-]
+
+        ## Bankfull quantities and floodplain constants
+        self._A_bank = self.main.area(self.h)
+        self._P_bank = self.main.wetted_perimeter(self.h)
+        self._M_bank = self.main.first_moment(self.h)
+        self._T_over = self.main.top_width(self.h) + 2 * self.Bf  # Width right above the banks
+        self._sqrt_1mf2 = np.sqrt(1 + self.mf**2)
+
+    def _split(self, y):
+        y = np.asarray(y, dtype=float)
+        return y, np.clip(y - self.h, 0.0, None), y > self.h
+
+    def area(self, y):
+        y, z, over = self._split(y)
+        return np.where(
+            over,
+            self._A_bank + self._T_over * z + self.mf * z**2,
+            self.main.area(y),
+        )
+
+    def wetted_perimeter(self, y):
+        y, z, over = self._split(y)
+        return np.where(
+            over,
+            self._P_bank + 2 * self.Bf + 2 * z * self._sqrt_1mf2,
+            self.main.wetted_perimeter(y),
+        )
+
+    def top_width(self, y):
+        y, z, over = self._split(y)
+        return np.where(over, self._T_over + 2 * self.mf * z, self.main.top_width(y))
+
+    def first_moment(self, y):
+        y, z, over = self._split(y)
+        return np.where(
+            over,
+            self._M_bank + self._A_bank * z + self._T_over * z**2 / 2 + self.mf * z**3 / 3,
+            self.main.first_moment(y),
+        )
+
+    def dP_dy(self, y):
+        y, z, over = self._split(y)
+        return np.where(over, 2 * self._sqrt_1mf2, self.main.dP_dy(y))
+
+    def dT_dy(self, y):
+        y, z, over = self._split(y)
+        return np.where(over, 2 * self.mf + 0 * z, self.main.dT_dy(y))
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    y = np.random.default_rng(340).uniform(0.01, 2.0, 1_000_000)  # Depths [m]
+
+    sections = {
+        "Rectangular": RectangularSection(4.0),
+        "Trapezoidal": TrapezoidalSection(4.0, 1.5),
+        "Triangular": TriangularSection(2.0),
+        "Circular": CircularSection(2.5),
+        "Compound": CompoundSection(4.0, 1.5, 1.2, 20.0, 3.0),
+    }
+
+    properties = ["area", "wetted_perimeter", "top_width", "hydraulic_radius", "dA_dy", "dP_dy"]
+
+    print(f"{'':>12}" + "".join(f"{p:>18}" for p in properties) + "   [ms per 10^6 depths]")
+    for name, section in sections.items():
+        timings = []
+        for prop in properties:
+            tic = perf_counter()
+            getattr(section, prop)(y)
+            timings.append(1e3 * (perf_counter() - tic))
+        print(f"{name:>12}" + "".join(f"{t:>18.1f}" for t in timings))
@@ -0,0 +1,34 @@
+import numpy as np
+
+__all__ = [
+    "topological_levels",
+]
+
+
+def topological_levels(downstream):
+    """Group the nodes of a tree into levels that can be processed together
+
+    `downstream[i]` is the index of the node receiving the flow of node i, or
+    -1 at an outlet. Level 0 holds the headwater nodes, and every node comes
+    after all the nodes draining into it (Kahn's algorithm, one level at a
+    time).
+    """
+    downstream = np.asarray(downstream)
+    n = len(downstream)
+    receives = downstream >= 0
+
+    upstream_count = np.bincount(downstream[receives], minlength=n)
+    levels = []
+    ready = np.flatnonzero(upstream_count == 0)
+
+    while ready.size:
+        levels.append(ready)
+        targets = downstream[ready]
+        targets = targets[targets >= 0]
+        np.subtract.at(upstream_count, targets, 1)
+        ready = np.unique(targets[upstream_count[targets] == 0])
+
+    if sum(len(level) for level in levels) != n:
+        raise ValueError("The network has a loop")
+
+    return levels
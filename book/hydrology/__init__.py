@@ -0,0 +1,36 @@
+from .rating import SegmentedRating, fit_segmented_rating, offset_power_law
+from .frequency import DISTRIBUTIONS, FloodFrequency, peak_matrix
+from .goodness_of_fit import goodness_of_fit
+from .risk import design_return_period, hydrologic_risk, simulate_risk
+from .curve_number import adjust_arc, catchment_excess, gridded_runoff, scs_runoff
+from .cn_table import CurveNumberTable, cn_lookup, load_cn_table
+from .routing import CungeRating, cunge_parameters, muskingum, route_network
+from .stage_discharge import RatingTable, apply_rating, convert_stage_record, iter_stage_chunks
+
+__all__ = [
+    "SegmentedRating",
+    "fit_segmented_rating",
+    "offset_power_law",
+    "RatingTable",
+    "apply_rating",
+    "convert_stage_record",
+    "iter_stage_chunks",
+    "DISTRIBUTIONS",
+    "FloodFrequency",
+    "peak_matrix",
+    "goodness_of_fit",
+    "design_return_period",
+    "hydrologic_risk",
+    "simulate_risk",
+    "scs_runoff",
+    "adjust_arc",
+    "gridded_runoff",
+    "catchment_excess",
+    "CurveNumberTable",
+    "load_cn_table",
+    "cn_lookup",
+    "muskingum",
+    "cunge_parameters",
+    "CungeRating",
+    "route_network",
+]
@@ -0,0 +1,165 @@
+import numpy as np
+from functools import lru_cache
+from html.parser import HTMLParser
+from pathlib import Path
+
+__all__ = [
+    "CN_TABLE_PATH",
+    "HSG",
+    "CurveNumberTable",
+    "load_cn_table",
+    "cn_lookup",
+]
+
+CN_TABLE_PATH = Path("book/assets/tables/SCS_curve_number.html")
+HSG = "ABCD"  # Hydrologic soil groups, coded 0 to 3 in soil rasters
+
+
+class _TableParser(HTMLParser):
+    """Text of the cells of every row of an HTML table, with their tag and rowspan
+
+    Cover types span several rows with `rowspan`, so they only appear in
+    the first row of their group.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows, self._cell, self._skip = [], None, 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "style":
+            self._skip += 1
+        elif tag == "tr":
+            self.rows.append([])
+        elif tag in ("th", "td"):
+            self._cell = [tag, int(dict(attrs).get("rowspan", 1)), ""]
+
+    def handle_endtag(self, tag):
+        if tag == "style":
+            self._skip -= 1
+        elif tag in ("th", "td") and self._cell is not None:
+            self._cell[2] = " ".join(self._cell[2].replace("⁄", "/").split())
+            self.rows[-1].append(tuple(self._cell))
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._cell is not None and not self._skip:
+            self._cell[2] += data
+
+
+class CurveNumberTable:
+    """Curve numbers by land cover class and hydrologic soil group
+
+    Class k is cover type `covers[cover[k]]` with description
+    `descriptions[k]` (treatment and hydrologic condition), and `cn[k, g]`
+    is its curve number on soil group `HSG[g]`. The last row and column of
+    `cn` are NaN, so that unknown codes can be mapped to them.
+    """
+
+    def __init__(self, covers, cover, descriptions, cn):
+        self.covers = covers
+        self.cover = cover
+        self.descriptions = descriptions
+        self.cn = cn
+
+    def __repr__(self):
+        return f"CurveNumberTable(classes={len(self)}, covers={len(self.covers)})"
+
+    def __len__(self):
+        return len(self.descriptions)
+
+    def code(self, cover: str, description: str = "") -> int:
+        """Class of the first row whose cover and description contain the given text"""
+        for k, text in enumerate(self.descriptions):
+            if cover in self.covers[self.cover[k]] and description in text:
+                return k
+        raise KeyError(f"No curve number class for {cover!r}, {description!r}")
+
+    def to_frame(self):
+        import pandas as pd
+
+        index = pd.MultiIndex.from_arrays(
+            [
+                pd.Categorical.from_codes(self.cover, self.covers),
+                self.descriptions,
+            ],
+            names=["Cover type", "Description"],
+        )
+        return pd.DataFrame(self.cn[:-1, :-1].astype(int), index=index, columns=list(HSG))
+
+
+@lru_cache
+def load_cn_table(path: str | Path = CN_TABLE_PATH) -> CurveNumberTable:
+    """Parse the TR-55 table of curve numbers shown in the SCS Curve Number page, once"""
+    parser = _TableParser()
+    parser.feed(Path(path).read_text())
+
+    covers, cover, descriptions, values = [], [], [], []
+    for row in parser.rows:
+        numbers = [text for tag, _, text in row if tag == "td" and text.isdigit()]
+        if len(numbers) != len(HSG):
+            continue  # Header rows
+
+        ## A cover type spans the rows below it; rows without one keep the previous
+        covers.extend(text for tag, _, text in row if tag == "th")
+
+        labels = [text for tag, _, text in row if tag == "td" and not text.isdigit()]
+        cover.append(len(covers) - 1)
+        descriptions.append(labels[0] if labels else covers[-1])
+        values.append([int(v) for v in numbers])
+
+    cn = np.full((len(values) + 1, len(HSG) + 1), np.nan, dtype=np.float32)
+    cn[:-1, :-1] = values
+    return CurveNumberTable(covers, np.array(cover, dtype=np.int16), descriptions, cn)
+
+
+def cn_lookup(land_cover, soil_group, table: CurveNumberTable | None = None):
+    """Curve number raster of the class codes in `land_cover` and HSG codes 0-3 in `soil_group`
+
+    A single fancy-indexing operation over the arrays, which broadcast
+    together. Codes outside the table (e.g. no data) give NaN.
+    """
+    table = table or load_cn_table()
+    n_classes, n_groups = table.cn.shape[0] - 1, table.cn.shape[1] - 1
+
+    land_cover, soil_group = np.asarray(land_cover), np.asarray(soil_group)
+    row = np.where((land_cover >= 0) & (land_cover < n_classes), land_cover, n_classes)
+    col = np.where((soil_group >= 0) & (soil_group < n_groups), soil_group, n_groups)
+    return table.cn[row, col]
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    import pandas as pd
+
+    table = load_cn_table()
+    print(table.to_frame())
+
+    ## Land cover and soil rasters with a band of no data
+    rng = np.random.default_rng(340)
+    rows = cols = 4_000
+    land_cover = rng.integers(0, len(table), (rows, cols), dtype=np.int16)
+    soil_group = rng.integers(0, len(HSG), (rows, cols), dtype=np.int8)
+    land_cover[:100] = -1
+
+    tic = perf_counter()
+    cn = cn_lookup(land_cover, soil_group, table)
+    indexed = perf_counter() - tic
+
+    ## Previous approach: join the cells to the table as rows of a data frame
+    tic = perf_counter()
+    long = table.to_frame().reset_index(drop=True).stack().rename("CN").reset_index()
+    long.columns = ["land_cover", "soil_group", "CN"]
+    long["soil_group"] = long["soil_group"].map(HSG.index)
+    cells = pd.DataFrame(
+        {"land_cover": land_cover.ravel(), "soil_group": soil_group.ravel().astype(np.int64)}
+    )
+    merged = cells.merge(long, how="left", on=["land_cover", "soil_group"])["CN"].to_numpy()
+    joined = perf_counter() - tic
+
+    assert np.array_equal(cn.ravel(), merged.astype(np.float32), equal_nan=True)
+    print(
+        f"{rows} × {cols} cells: fancy indexing {indexed:.2f} s, "
+        f"data frame merge {joined:.2f} s; mean CN {np.nanmean(cn):.1f}"
+    )
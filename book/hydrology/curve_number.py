@@ -0,0 +1,211 @@
+import numpy as np
+
+__all__ = [
+    "storage_deficit",
+    "adjust_arc",
+    "antecedent_condition",
+    "scs_runoff",
+    "excess_hyetograph",
+    "gridded_runoff",
+    "catchment_excess",
+]
+
+UNITS = {"in": 1.0, "mm": 25.4}  # Depth of one inch in each unit
+
+
+def storage_deficit(CN, units: str = "in"):
+    """Soil-moisture storage deficit S = 1000/CN - 10 [in], NaN where CN is not in (0, 100]"""
+    CN = np.asarray(CN, dtype=float)
+    valid = (CN > 0) & (CN <= 100)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid, (1000 / CN - 10) * UNITS[units], np.nan)
+
+
+def adjust_arc(CN, arc=2):
+    """Curve numbers for dry (ARC I) or wet (ARC III) antecedent runoff conditions
+
+    `CN` is given for average conditions (ARC II) and `arc` may be an array
+    of 1, 2 or 3 per cell (Chow et al., 1988).
+    """
+    CN = np.asarray(CN, dtype=float)
+    arc = np.asarray(arc)
+    return np.select(
+        [arc == 1, arc == 3],
+        [4.2 * CN / (10 - 0.058 * CN), 23 * CN / (10 + 0.13 * CN)],
+        default=CN,
+    )
+
+
+def antecedent_condition(rain_5day, dormant: bool = False, units: str = "in"):
+    """ARC (1, 2 or 3) from the total rainfall of the previous five days
+
+    Thresholds are 1.4 and 2.1 in during the growing season, and 0.5 and
+    1.1 in in the dormant season.
+    """
+    low, high = (0.5, 1.1) if dormant else (1.4, 2.1)
+    rain = np.asarray(rain_5day, dtype=float) / UNITS[units]
+    return np.where(rain < low, 1, np.where(rain > high, 3, 2))
+
+
+def scs_runoff(P, CN, ratio: float = 0.2, units: str = "in"):
+    """Runoff depth R from the cumulative rainfall P, in the units of P
+
+    R = (P - I_a)² / (P - I_a + S) above the initial abstraction
+    I_a = `ratio` · S, and zero below it. `P` and `CN` broadcast together.
+    """
+    P = np.asarray(P, dtype=float)
+    S = storage_deficit(CN, units)
+    Ia = ratio * S
+    excess = np.maximum(P - Ia, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        runoff = np.where(excess > 0, excess**2 / (excess + S), 0.0)
+    return np.where(np.isnan(S), np.nan, runoff)
+
+
+def excess_hyetograph(rain, CN, ratio: float = 0.2, units: str = "in"):
+    """Rainfall excess of every time step, from the rainfall of every step along axis 0"""
+    cumulative = scs_runoff(np.cumsum(rain, axis=0), CN, ratio, units)
+    return np.diff(cumulative, axis=0, prepend=np.zeros_like(cumulative[:1]))
+
+
+def _read_steps(precipitation, rows: slice, cols: slice):
+    """Rainfall of a block as (time, rows, cols), from a raster, an array or a hyetograph"""
+    if hasattr(precipitation, "read"):
+        from rasterio.windows import Window
+
+        return precipitation.read(window=Window.from_slices(rows, cols)).astype(float)
+
+    precipitation = precipitation if hasattr(precipitation, "ndim") else np.asarray(precipitation)
+    if precipitation.ndim == 3:
+        return np.asarray(precipitation[:, rows, cols], dtype=float)
+    if precipitation.ndim == 2:
+        return np.asarray(precipitation[rows, cols], dtype=float)[None]
+    return np.asarray(precipitation, dtype=float).reshape(-1, 1, 1)  # Same rain on every cell
+
+
+def _blocks(cn, precipitation, arc, tile: int, nodata=None):
+    """Curve numbers, ARC adjusted, and rainfall of every block of the CN raster"""
+    from book.watershed.tiled import iter_tiles, read_window
+
+    shape = (cn.height, cn.width) if hasattr(cn, "read") else cn.shape
+    for (r, c), _, _ in iter_tiles(shape, tile):
+        block = read_window(cn, r, c, nodata)
+        if hasattr(arc, "read") or np.ndim(arc):  # A raster of conditions, like `cn`
+            block = adjust_arc(block, read_window(arc, r, c))
+        elif arc != 2:
+            block = adjust_arc(block, arc)
+        yield r, c, block, _read_steps(precipitation, r, c)
+
+
+def gridded_runoff(
+    cn, precipitation, destination=None, arc=2, ratio=0.2, units="in", tile=512, nodata=None
+):
+    """Total runoff depth of every cell, one block of the rasters at a time
+
+    `cn` is a raster of ARC II curve numbers (an open `rasterio` dataset or
+    an array, e.g. from `cn_lookup`) and `arc` a single condition or a
+    raster of them. `precipitation` is a single depth, a hyetograph applied
+    to every cell, or a raster (rows, cols) or stack (time, rows, cols) of
+    rainfall; a multi-band `rasterio` dataset is read one band per time step.
+    `destination` may be a writable memory map for grids that do not fit in
+    memory, and has NaN where CN has no data.
+    """
+    if destination is None:
+        shape = (cn.height, cn.width) if hasattr(cn, "read") else cn.shape
+        destination = np.empty(shape, dtype=np.float32)
+
+    for r, c, CN, rain in _blocks(cn, precipitation, arc, tile, nodata):
+        destination[r, c] = scs_runoff(rain.sum(axis=0), CN, ratio, units)
+
+    return destination
+
+
+def catchment_excess(
+    cn, precipitation, labels, n_labels: int, arc=2, ratio=0.2, units="in", tile=512, nodata=None
+):
+    """Mean rainfall excess of every time step over each catchment, as (time, n_labels)
+
+    `labels` is a raster of catchment numbers 0 to n_labels - 1 (negative
+    outside every catchment), read by blocks like `cn`. Cells without a
+    curve number are left out of the mean.
+    """
+    from book.watershed.tiled import read_window
+
+    total, cells = None, np.zeros(n_labels)
+
+    for r, c, CN, rain in _blocks(cn, precipitation, arc, tile, nodata):
+        label = np.nan_to_num(read_window(labels, r, c), nan=-1).astype(np.int64)
+        keep = (label >= 0) & ~np.isnan(CN)
+        label = label[keep]
+        cells += np.bincount(label, minlength=n_labels)
+        if total is None:
+            total = np.zeros((len(rain), n_labels))
+
+        ## One time step at a time, so memory does not grow with the length of the storm
+        cumulative, previous = np.zeros(CN.shape), np.zeros(CN.shape)
+        for t, step in enumerate(rain):
+            cumulative += step
+            current = scs_runoff(cumulative, CN, ratio, units)
+            total[t] += np.bincount(label, weights=(current - previous)[keep], minlength=n_labels)
+            previous = current
+
+    with np.errstate(invalid="ignore"):
+        return total / cells
+
+
+def _benchmark(path, n_labels: int):
+    # Runs in a fresh process, so that its peak resident memory only covers the computation
+    import resource
+    from time import perf_counter
+
+    cn = np.load(path / "cn.npy", mmap_mode="r")
+    labels = np.load(path / "labels.npy", mmap_mode="r")
+    rain = np.load(path / "rain.npy", mmap_mode="r")
+    runoff = np.lib.format.open_memmap(path / "runoff.npy", "w+", np.float32, cn.shape)
+
+    tic = perf_counter()
+    gridded_runoff(cn, rain, runoff, arc=3)
+    runoff.flush()
+    gridded = perf_counter() - tic
+
+    tic = perf_counter()
+    excess = catchment_excess(cn, rain, labels, n_labels, arc=3)
+    aggregated = perf_counter() - tic
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return gridded, aggregated, peak, excess
+
+
+if __name__ == "__main__":
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    from pathlib import Path
+
+    ## Basin-wide grids on disk: curve numbers, catchment labels and 24 hourly rainfall fields
+    rng = np.random.default_rng(340)
+    rows, cols, steps, n_labels = 3_000, 3_000, 24, 400
+    path = Path(tempfile.mkdtemp())
+
+    cn = np.lib.format.open_memmap(path / "cn.npy", "w+", np.float32, (rows, cols))
+    labels = np.lib.format.open_memmap(path / "labels.npy", "w+", np.int32, (rows, cols))
+    rain = np.lib.format.open_memmap(path / "rain.npy", "w+", np.float32, (steps, rows, cols))
+    hyetograph = np.exp(-0.5 * ((np.arange(steps) - 8) / 3) ** 2)
+    for r0 in range(0, rows, 500):
+        block = slice(r0, r0 + 500)
+        cn[block] = rng.choice([39, 61, 74, 80, 98], size=(500, cols))
+        labels[block] = (np.arange(r0, r0 + 500)[:, None] // 150) * 20 + np.arange(cols) // 150
+        rain[:, block] = hyetograph[:, None, None] * rng.gamma(4, 0.05, (1, 500, cols))
+    for array in (cn, labels, rain):
+        array.flush()
+    del cn, labels, rain
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        gridded, aggregated, peak, excess = pool.submit(_benchmark, path, n_labels).result()
+
+    print(
+        f"{rows} × {cols} cells, {steps} time steps: runoff grid in {gridded:.1f} s, "
+        f"excess hyetographs of {n_labels} catchments in {aggregated:.1f} s; "
+        f"peak resident memory {peak:.0f} MiB, including the pages of the memory-mapped input"
+    )
+    runoff = np.load(path / "runoff.npy", mmap_mode="r")
+    print(f"Mean runoff {np.nanmean(runoff):.2f} in, largest hourly excess {excess.max():.3f} in")
@@ -0,0 +1,275 @@
+import numpy as np
+from scipy.special import ndtr, ndtri, gammaln
+from scipy.stats import pearson3
+from typing import Literal
+
+__all__ = [
+    "DISTRIBUTIONS",
+    "peak_matrix",
+    "sample_moments",
+    "sample_lmoments",
+    "station_skew_mse",
+    "weighted_skew",
+    "FloodFrequency",
+    "weibull_plotting_position",
+]
+
+DISTRIBUTIONS = ("Normal", "Log-normal", "Gumbel", "Log-Pearson III")
+
+EULER_GAMMA = 0.5772156649
+
+
+def peak_matrix(series) -> np.ndarray:
+    """Stack annual peak series of different lengths into a (sites, years) array padded with NaN
+
+    Accepts a single series/array, a DataFrame from `nwis.get_discharge_peaks`
+    (column `peak_va`), or a list of any of those.
+    """
+    if hasattr(series, "columns") or not isinstance(series, (list, tuple)):
+        series = [series]
+
+    rows = [
+        np.asarray(s["peak_va"] if hasattr(s, "columns") else s, dtype=float).ravel()
+        for s in series
+    ]
+    out = np.full((len(rows), max(len(r) for r in rows)), np.nan)
+    for i, r in enumerate(rows):
+        out[i, : len(r)] = r
+
+    return out
+
+
+def sample_moments(x):
+    """Mean, standard deviation and bias-corrected skew along the last axis, ignoring NaN"""
+    n = np.sum(np.isfinite(x), axis=-1)
+    mean = np.nanmean(x, axis=-1)
+    dev = x - mean[..., None]
+
+    with np.errstate(all="ignore"):
+        std = np.sqrt(np.nansum(dev**2, axis=-1) / (n - 1))
+        skew = n * np.nansum(dev**3, axis=-1) / ((n - 1) * (n - 2) * std**3)
+
+    return mean, std, skew
+
+
+def sample_lmoments(x):
+    """First three sample L-moments (λ1, λ2, τ3) along the last axis, ignoring NaN
+
+    Uses the unbiased probability-weighted moments b0, b1, b2 of the sorted
+    sample. NaN sorts to the end of each row, so every row keeps its own length.
+    """
+    xs = np.sort(x, axis=-1)
+    n = np.sum(np.isfinite(xs), axis=-1)[..., None].astype(float)
+    j = np.arange(1, xs.shape[-1] + 1, dtype=float)  # Rank of each value
+
+    valid = np.isfinite(xs)
+    xs = np.where(valid, xs, 0.0)
+
+    with np.errstate(all="ignore"):
+        w1 = np.where(valid, (j - 1) / (n - 1), 0.0)
+        w2 = np.where(valid, (j - 1) * (j - 2) / ((n - 1) * (n - 2)), 0.0)
+
+        b0 = np.sum(xs, axis=-1) / n[..., 0]
+        b1 = np.sum(w1 * xs, axis=-1) / n[..., 0]
+        b2 = np.sum(w2 * xs, axis=-1) / n[..., 0]
+
+        l1 = b0
+        l2 = 2 * b1 - b0
+        l3 = 6 * b2 - 6 * b1 + b0
+
+        return l1, l2, l3 / l2
+
+
+def _pearson3_from_lmoments(l1, l2, t3):
+    # Hosking & Wallis (1997), rational approximations for the shape parameter
+    abs_t3 = np.abs(t3)
+
+    with np.errstate(all="ignore"):
+        z = 3 * np.pi * t3**2
+        alpha_low = (1 + 0.2906 * z) / (z + 0.1882 * z**2 + 0.0442 * z**3)
+
+        z = 1 - abs_t3
+        alpha_high = (0.36067 * z - 0.59567 * z**2 + 0.25361 * z**3) / (
+            1 - 2.78861 * z + 2.56096 * z**2 - 0.77045 * z**3
+        )
+
+        alpha = np.where(abs_t3 < 1 / 3, alpha_low, alpha_high)
+        skew = np.where(t3 == 0, 0.0, 2 * np.sign(t3) / np.sqrt(alpha))
+        std = np.where(
+            t3 == 0,
+            l2 * np.sqrt(np.pi),
+            l2 * np.sqrt(np.pi * alpha) * np.exp(gammaln(alpha) - gammaln(alpha + 0.5)),
+        )
+
+    return l1, std, skew
+
+
+def station_skew_mse(skew, n):
+    """Mean square error of the station skew (Bulletin 17B/17C approximation)"""
+    abs_g = np.abs(skew)
+    A = np.where(abs_g <= 0.9, -0.33 + 0.08 * abs_g, -0.52 + 0.30 * abs_g)
+    B = np.where(abs_g <= 1.5, 0.94 - 0.26 * abs_g, 0.55)
+    return np.power(10.0, A - B * np.log10(n / 10))
+
+
+def weighted_skew(station_skew, n, regional_skew, regional_skew_mse: float = 0.302):
+    """Weight the station and regional skews inversely to their mean square errors"""
+    mse_station = station_skew_mse(station_skew, n)
+    return (regional_skew_mse * station_skew + mse_station * regional_skew) / (
+        regional_skew_mse + mse_station
+    )
+
+
+class FloodFrequency:
+    """Normal, Log-normal, Gumbel and Log-Pearson III fits to annual peak series
+
+    All sites are fitted at once: `peaks` is a (sites, years) array padded
+    with NaN, or anything accepted by `peak_matrix`. Log distributions use
+    base-10 logarithms of the positive peaks.
+    """
+
+    def __init__(
+        self,
+        peaks,
+        method: Literal["moments", "lmoments"] = "moments",
+        regional_skew=None,
+        regional_skew_mse: float = 0.302,
+    ):
+        if isinstance(peaks, np.ndarray) and peaks.ndim == 2:
+            self.peaks = peaks.astype(float)
+        else:
+            self.peaks = peak_matrix(peaks)
+
+        self.method = method
+        self.n = np.sum(np.isfinite(self.peaks), axis=-1)
+
+        with np.errstate(all="ignore"):
+            log_peaks = np.log10(np.where(self.peaks > 0, self.peaks, np.nan))
+
+        if method == "moments":
+            mean, std, _ = sample_moments(self.peaks)
+            log_mean, log_std, log_skew = sample_moments(log_peaks)
+            lp3_std = log_std
+            gumbel_scale = np.sqrt(6) * std / np.pi
+
+        elif method == "lmoments":
+            l1, l2, _ = sample_lmoments(self.peaks)
+            mean, std = l1, l2 * np.sqrt(np.pi)
+            gumbel_scale = l2 / np.log(2)
+
+            log_l1, log_l2, log_t3 = sample_lmoments(log_peaks)
+            log_mean, log_std = log_l1, log_l2 * np.sqrt(np.pi)
+            _, lp3_std, log_skew = _pearson3_from_lmoments(log_l1, log_l2, log_t3)
+
+        else:
+            raise ValueError(f"Unknown method {method!r}, use 'moments' or 'lmoments'")
+
+        self.station_skew = log_skew
+        if regional_skew is not None:
+            log_skew = weighted_skew(log_skew, self.n, regional_skew, regional_skew_mse)
+
+        self.params = {
+            "Normal": (mean, std),
+            "Log-normal": (log_mean, log_std),
+            "Gumbel": (mean - EULER_GAMMA * gumbel_scale, gumbel_scale),
+            "Log-Pearson III": (log_mean, lp3_std, log_skew),
+        }
+
+    def quantiles(self, return_periods, distribution: str | None = None):
+        """Peak discharge for each return period, shape (sites, len(return_periods))
+
+        Returns a dict with every distribution unless one is named.
+        """
+        if distribution is None:
+            return {d: self.quantiles(return_periods, d) for d in DISTRIBUTIONS}
+
+        p = 1.0 - 1.0 / np.atleast_1d(np.asarray(return_periods, dtype=float))  # Non-exceedance
+
+        if distribution == "Normal":
+            mean, std = self.params[distribution]
+            return mean[:, None] + std[:, None] * ndtri(p)
+
+        elif distribution == "Log-normal":
+            mean, std = self.params[distribution]
+            return np.power(10.0, mean[:, None] + std[:, None] * ndtri(p))
+
+        elif distribution == "Gumbel":
+            u, alpha = self.params[distribution]
+            return u[:, None] - alpha[:, None] * np.log(-np.log(p))
+
+        elif distribution == "Log-Pearson III":
+            mean, std, skew = self.params[distribution]
+            K = pearson3.ppf(p[None, :], skew[:, None])  # Frequency factors
+            return np.power(10.0, mean[:, None] + std[:, None] * K)
+
+        raise ValueError(f"Unknown distribution {distribution!r}")
+
+    def cdf(self, x, distribution: str):
+        """Non-exceedance probability of `x` (shape (sites, m) or (m,)) at each site"""
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+
+        with np.errstate(all="ignore"):
+            log_x = np.log10(np.where(x > 0, x, np.nan))
+
+            if distribution == "Normal":
+                mean, std = self.params[distribution]
+                return ndtr((x - mean[:, None]) / std[:, None])
+
+            elif distribution == "Log-normal":
+                mean, std = self.params[distribution]
+                return np.where(x > 0, ndtr((log_x - mean[:, None]) / std[:, None]), 0.0)
+
+            elif distribution == "Gumbel":
+                u, alpha = self.params[distribution]
+                return np.exp(-np.exp(-(x - u[:, None]) / alpha[:, None]))
+
+            elif distribution == "Log-Pearson III":
+                mean, std, skew = self.params[distribution]
+                z = (log_x - mean[:, None]) / std[:, None]
+                return np.where(x > 0, pearson3.cdf(z, skew[:, None]), 0.0)
+
+        raise ValueError(f"Unknown distribution {distribution!r}")
+
+    def return_period(self, x, distribution: str):
+        """Return period [years] of the discharge `x` at each site"""
+        with np.errstate(divide="ignore"):
+            return 1.0 / (1.0 - self.cdf(x, distribution))
+
+    def to_frame(self, return_periods, site: int = 0):
+        """Table of quantiles for one site, one column per distribution"""
+        import pandas as pd
+
+        return pd.DataFrame(
+            {d: q[site] for d, q in self.quantiles(return_periods).items()},
+            index=pd.Index(np.atleast_1d(return_periods), name="Return period [yr]"),
+        )
+
+
+def weibull_plotting_position(peaks):
+    """Empirical return period T = (n + 1) / m of each peak, sorted from largest"""
+    x = np.sort(np.asarray(peaks, dtype=float)[np.isfinite(peaks)])[::-1]
+    rank = np.arange(1, len(x) + 1)
+    return x, (len(x) + 1) / rank
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    rng = np.random.default_rng(340)
+    n_sites, n_years = 5_000, 80
+
+    ## Synthetic log-normal peaks with uneven record lengths
+    peaks = np.power(10, rng.normal(4.0, 0.25, (n_sites, n_years)))
+    record_length = rng.integers(20, n_years + 1, n_sites)
+    peaks[np.arange(n_years)[None, :] >= record_length[:, None]] = np.nan
+
+    return_periods = np.array([2, 5, 10, 25, 50, 100, 200, 500])
+
+    for method in ("moments", "lmoments"):
+        tic = perf_counter()
+        fit = FloodFrequency(peaks, method=method, regional_skew=0.0)
+        fit.quantiles(return_periods)
+        elapsed = perf_counter() - tic
+        print(
+            f"{method:>9}: {n_sites:,} sites in {elapsed:.3f} s ({60 * n_sites / elapsed:,.0f} sites/min)"
+        )
@@ -0,0 +1,279 @@
+import numpy as np
+from itertools import combinations
+from scipy.optimize import curve_fit
+
+__all__ = [
+    "exponential_rating",
+    "exponential_rating_jac",
+    "offset_power_law",
+    "offset_power_law_jac",
+    "SegmentedRating",
+    "fit_power_law_segment",
+    "fit_segmented_rating",
+]
+
+
+def exponential_rating(H, a, b, c):
+    """Single exponential rating used in the rating curve page, Q = a exp(bH) + c"""
+    return a * np.exp(b * H) + c
+
+
+def exponential_rating_jac(H, a, b, c):
+    """Analytic Jacobian of `exponential_rating` with respect to (a, b, c)"""
+    exp_bH = np.exp(b * H)
+    return np.stack(np.broadcast_arrays(exp_bH, a * H * exp_bH, np.ones_like(exp_bH)), axis=-1)
+
+
+def offset_power_law(H, C, e, beta):
+    """Single segment of a stage-discharge rating, Q = C (H - e)^β"""
+    head = np.clip(H - e, 0.0, None)  # Effective head above the offset [ft]
+    return C * np.power(head, beta)
+
+
+def offset_power_law_jac(H, C, e, beta):
+    """Analytic Jacobian of `offset_power_law` with respect to (C, e, β)"""
+    head = np.clip(H - e, 1e-12, None)
+    head_pow = np.power(head, beta)
+
+    dQ_dC = head_pow
+    dQ_de = -C * beta * head_pow / head
+    dQ_dbeta = C * head_pow * np.log(head)
+
+    return np.column_stack([dQ_dC, dQ_de, dQ_dbeta])
+
+
+def _anchored_power_law(H, e, beta, anchor_H, anchor_Q):
+    # Segment forced through the point (anchor_H, anchor_Q) so that the
+    # rating stays continuous at the breakpoint.
+    ratio = np.clip(H - e, 0.0, None) / (anchor_H - e)
+    return anchor_Q * np.power(ratio, beta)
+
+
+def _anchored_power_law_jac(H, e, beta, anchor_H, anchor_Q):
+    head = np.clip(H - e, 1e-12, None)
+    Q = _anchored_power_law(H, e, beta, anchor_H, anchor_Q)
+
+    dQ_de = Q * beta * (H - anchor_H) / (head * (anchor_H - e))
+    dQ_dbeta = Q * np.log(head / (anchor_H - e))
+
+    return np.column_stack([dQ_de, dQ_dbeta])
+
+
+class SegmentedRating:
+    """Multi-segment offset power-law rating curve
+
+    Segment `k` applies for `breaks[k-1] <= H < breaks[k]`, with Q = C_k (H - e_k)^β_k.
+    Stages below the lowest offset return zero discharge.
+    """
+
+    def __init__(self, breaks, C, e, beta):
+        self.breaks = np.asarray(breaks, dtype=float)  # Interior breakpoints [ft]
+        self.C = np.asarray(C, dtype=float)  # Coefficients [cfs/ft^β]
+        self.e = np.asarray(e, dtype=float)  # Gage height of zero flow [ft]
+        self.beta = np.asarray(beta, dtype=float)  # Exponents [-]
+
+        if not (len(self.C) == len(self.e) == len(self.beta) == len(self.breaks) + 1):
+            raise ValueError("A rating with k segments needs k-1 breakpoints")
+
+        # Precompute log(C) so evaluation is a single exp per reading
+        self._logC = np.log(self.C)
+
+    @property
+    def n_segments(self):
+        return len(self.C)
+
+    def segment_index(self, H):
+        return np.searchsorted(self.breaks, H, side="right")
+
+    def __call__(self, H):
+        H = np.asarray(H, dtype=float)
+        k = self.segment_index(H)
+
+        head = H - self.e[k]
+        valid = head > 0
+
+        Q = np.zeros_like(H)
+        Q[valid] = np.exp(self._logC[k[valid]] + self.beta[k[valid]] * np.log(head[valid]))
+        return Q
+
+    def to_frame(self):
+        import pandas as pd
+
+        lower = np.r_[-np.inf, self.breaks]
+        upper = np.r_[self.breaks, np.inf]
+
+        return pd.DataFrame(
+            {"H from": lower, "H to": upper, "C": self.C, "e": self.e, "β": self.beta},
+            index=pd.RangeIndex(1, self.n_segments + 1, name="Segment"),
+        )
+
+    def __repr__(self):
+        return (
+            f"SegmentedRating(breaks={self.breaks.tolist()}, C={self.C.tolist()}, "
+            f"e={self.e.tolist()}, beta={self.beta.tolist()})"
+        )
+
+
+def _initial_guess(H, Q, e_max):
+    ## Linear regression of log(Q) vs log(H - e) for an offset below the data
+    span = max(np.ptp(H), 1.0)
+    e0 = min(e_max, H.min()) - 0.1 * span
+    beta0, logC0 = np.polyfit(np.log(H - e0), np.log(Q), 1)
+    return np.exp(logC0), e0, float(np.clip(beta0, 0.2, 9.0))
+
+
+def fit_power_law_segment(H, Q, anchor: tuple[float, float] | None = None):
+    """Fit one offset power-law segment using `curve_fit` with analytic Jacobians
+
+    If `anchor=(H_b, Q_b)` is given, the segment is forced through that point and
+    only (e, β) are fitted. Residuals are weighted by Q (relative errors).
+
+    Returns (C, e, β, sum of squared relative residuals)
+    """
+    H = np.asarray(H, dtype=float)
+    Q = np.asarray(Q, dtype=float)
+
+    e_max = H.min() if anchor is None else min(H.min(), anchor[0])
+    e_max -= 1e-6 * max(np.ptp(H), 1.0)
+    C0, e0, beta0 = _initial_guess(H, Q, e_max)
+
+    if anchor is None:
+        popt, _ = curve_fit(
+            offset_power_law,
+            H,
+            Q,
+            p0=[C0, e0, beta0],
+            sigma=Q,
+            jac=offset_power_law_jac,
+            bounds=([0.0, -np.inf, 0.05], [np.inf, e_max, 10.0]),
+            method="trf",
+        )
+        C, e, beta = popt
+
+    else:
+        anchor_H, anchor_Q = anchor
+        popt, _ = curve_fit(
+            lambda x, e, beta: _anchored_power_law(x, e, beta, anchor_H, anchor_Q),
+            H,
+            Q,
+            p0=[e0, beta0],
+            sigma=Q,
+            jac=lambda x, e, beta: _anchored_power_law_jac(x, e, beta, anchor_H, anchor_Q),
+            bounds=([-np.inf, 0.05], [e_max, 10.0]),
+            method="trf",
+        )
+        e, beta = popt
+        C = anchor_Q / np.power(anchor_H - e, beta)
+
+    relative_residual = (Q - offset_power_law(H, C, e, beta)) / Q
+    return C, e, beta, float(np.sum(relative_residual**2))
+
+
+def _fit_with_breaks(H, Q, breaks, continuous):
+    edges = np.r_[-np.inf, breaks, np.inf]
+    C, e, beta = [], [], []
+    sse = 0.0
+
+    for k in range(len(edges) - 1):
+        mask = (H >= edges[k]) & (H < edges[k + 1])
+        anchor = None
+        if continuous and k > 0:
+            b = edges[k]
+            anchor = (b, offset_power_law(b, C[-1], e[-1], beta[-1]))
+
+        Ck, ek, betak, ssek = fit_power_law_segment(H[mask], Q[mask], anchor=anchor)
+        C.append(Ck)
+        e.append(ek)
+        beta.append(betak)
+        sse += ssek
+
+    return SegmentedRating(breaks, C, e, beta), sse
+
+
+def fit_segmented_rating(
+    stage,
+    discharge,
+    n_segments: int = 2,
+    min_points: int = 5,
+    n_candidates: int = 24,
+    continuous: bool = True,
+):
+    """Fit a multi-segment offset power-law rating with automatic breakpoint search
+
+    Breakpoints are searched over `n_candidates` stage quantiles, keeping at least
+    `min_points` measurements in each segment. The combination with the lowest sum
+    of squared relative residuals is returned.
+
+    Returns (SegmentedRating, sum of squared relative residuals)
+    """
+    H = np.asarray(stage, dtype=float)
+    Q = np.asarray(discharge, dtype=float)
+
+    valid = np.isfinite(H) & np.isfinite(Q) & (Q > 0)
+    H, Q = H[valid], Q[valid]
+
+    order = np.argsort(H)
+    H, Q = H[order], Q[order]
+
+    if n_segments < 1:
+        raise ValueError("n_segments must be at least 1")
+
+    if len(H) < n_segments * min_points:
+        raise ValueError(
+            f"Not enough measurements ({len(H)}) for {n_segments} segments "
+            f"of at least {min_points} points"
+        )
+
+    if n_segments == 1:
+        return _fit_with_breaks(H, Q, np.array([]), continuous)
+
+    ## Candidate breakpoints are midpoints between consecutive unique stages
+    ## that leave at least `min_points` measurements at both ends
+    unique_H = np.unique(H[min_points - 1 : len(H) - min_points + 1])
+    midpoints = 0.5 * (unique_H[:-1] + unique_H[1:])
+    if len(midpoints) > n_candidates:
+        idx = np.linspace(0, len(midpoints) - 1, n_candidates).round().astype(int)
+        midpoints = np.unique(midpoints[idx])
+
+    ## Number of points in each would-be segment, for all candidates at once
+    positions = np.searchsorted(H, midpoints)
+
+    best_rating, best_sse = None, np.inf
+    for combo in combinations(range(len(midpoints)), n_segments - 1):
+        counts = np.diff(np.r_[0, positions[list(combo)], len(H)])
+        if np.any(counts < min_points):
+            continue
+
+        try:
+            rating, sse = _fit_with_breaks(H, Q, midpoints[list(combo)], continuous)
+        except (RuntimeError, ValueError):
+            continue
+
+        if sse < best_sse:
+            best_rating, best_sse = rating, sse
+
+    if best_rating is None:
+        raise RuntimeError("No breakpoint combination could be fitted")
+
+    return best_rating, best_sse
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    rng = np.random.default_rng(340)
+    true_rating = SegmentedRating([4.0], C=[60.0, 150.0], e=[-1.0, 1.2], beta=[2.1, 1.6])
+
+    H_field = np.sort(rng.uniform(-0.5, 25, 150))
+    Q_field = true_rating(H_field) * rng.lognormal(0.0, 0.05, H_field.size)
+
+    tic = perf_counter()
+    rating, sse = fit_segmented_rating(H_field, Q_field, n_segments=2)
+    print(f"Fit 2 segments in {perf_counter() - tic:.3f} s -> {rating}")
+
+    ## 20 years of 15-minute stage readings
+    H_series = rng.uniform(0, 25, 20 * 365 * 96)
+    tic = perf_counter()
+    rating(H_series)
+    elapsed = perf_counter() - tic
+    print(f"Evaluated {H_series.size:,} readings in {elapsed:.3f} s")
@@ -0,0 +1,216 @@
+import numpy as np
+from scipy.special import ndtri
+
+__all__ = [
+    "hydrologic_risk",
+    "nonstationary_risk",
+    "design_return_period",
+    "RiskSimulation",
+    "simulate_risk",
+]
+
+
+def hydrologic_risk(return_period, design_life):
+    """Probability of at least one exceedance of the T-year event in n years"""
+    T = np.asarray(return_period, dtype=float)
+    n = np.asarray(design_life, dtype=float)
+    return -np.expm1(n * np.log1p(-1.0 / T))  # 1 - (1 - 1/T)^n, accurate for large T
+
+
+def nonstationary_risk(return_period, design_life, trend: float = 0.01):
+    """Risk when the annual exceedance probability grows by a factor (1 + trend) every year
+
+    The T-year event is defined at the start of the design life, with annual
+    exceedance probability p_i = min(1, (1 + trend)^i / T) in year i = 0, ..., n - 1.
+    """
+    T, n = np.broadcast_arrays(
+        np.asarray(return_period, dtype=float), np.asarray(design_life, dtype=float)
+    )
+    years = np.arange(int(np.max(n)))
+    p = np.minimum(1.0, np.power(1.0 + trend, years) / T[..., None])
+
+    log_survival = np.where(years < n[..., None], np.log1p(-np.minimum(p, 1 - 1e-16)), 0.0)
+    return -np.expm1(np.sum(log_survival, axis=-1))
+
+
+def design_return_period(
+    risk,
+    design_life,
+    risk_model=None,
+    T_bounds: tuple[float, float] = (1.0 + 1e-9, 1e9),
+    xtol: float = 1e-10,
+    max_iter: int = 200,
+):
+    """Return period T such that the risk over `design_life` years equals `risk`
+
+    Without a `risk_model`, this is the closed-form inverse of the stationary risk,
+    T = 1 / (1 - (1 - R)^(1/n)). A `risk_model(T, n)` that decreases with T (e.g.,
+    `nonstationary_risk`) is inverted element-wise with a vectorized, always
+    bracketed Illinois (modified regula falsi) iteration on log(T).
+    """
+    R, n = np.broadcast_arrays(np.asarray(risk, dtype=float), np.asarray(design_life, dtype=float))
+
+    if risk_model is None:
+        with np.errstate(divide="ignore"):
+            return -1.0 / np.expm1(np.log1p(-R) / n)
+
+    ## Bracket in log(T): f = risk_model - R is positive at T_low and negative at T_high
+    a = np.full(R.shape, np.log(T_bounds[0]))
+    b = np.full(R.shape, np.log(T_bounds[1]))
+    fa = risk_model(np.exp(a), n) - R
+    fb = risk_model(np.exp(b), n) - R
+
+    bracketed = (fa >= 0) & (fb <= 0)
+    side = np.zeros(R.shape, dtype=int)
+
+    for _ in range(max_iter):
+        c = (a * fb - b * fa) / (fb - fa)
+        c = np.where(np.isfinite(c), c, 0.5 * (a + b))
+        fc = risk_model(np.exp(c), n) - R
+
+        move_b = fc < 0  # Root between a and c
+        b = np.where(move_b, c, b)
+        fb = np.where(move_b, fc, fb)
+        a = np.where(move_b, a, c)
+        fa = np.where(move_b, fa, fc)
+
+        # Illinois step: halve the function value of the endpoint kept twice in a row
+        fa = np.where(move_b & (side == 1), fa / 2, fa)
+        fb = np.where(~move_b & (side == -1), fb / 2, fb)
+        side = np.where(move_b, 1, -1)
+
+        if np.all((np.abs(b - a) < xtol) | (fc == 0) | ~bracketed):
+            break
+
+    return np.where(bracketed, np.exp(c), np.nan)
+
+
+class RiskSimulation:
+    """Empirical hydrologic risk from synthetic annual-maximum series
+
+    `exceedances[i, j]` counts the simulated design lives of length
+    `design_lives[i]` in which the `return_periods[j]`-year event was exceeded
+    at least once, out of `n_lives[i]` simulated lives.
+    """
+
+    def __init__(self, design_lives, return_periods, exceedances, n_lives):
+        self.design_lives = design_lives
+        self.return_periods = return_periods
+        self.exceedances = exceedances
+        self.n_lives = n_lives
+
+    @property
+    def simulated_years(self):
+        return int(np.max(self.n_lives * self.design_lives))
+
+    @property
+    def risk(self):
+        return self.exceedances / self.n_lives[:, None]
+
+    def confidence_interval(self, level: float = 0.95):
+        """Wilson score interval of the empirical risk, shape (2, lives, return periods)"""
+        z = ndtri(0.5 + level / 2)
+        n = self.n_lives[:, None]
+        p = self.risk
+
+        center = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+        half_width = z / (1 + z**2 / n) * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2))
+        return np.stack([center - half_width, center + half_width])
+
+    def design_return_period(self, target_risk):
+        """Smallest simulated return period whose empirical risk is at most `target_risk`
+
+        Interpolated linearly in log(T) between the simulated return periods.
+        Returns one value per design life (NaN if outside the simulated range).
+        """
+        log_T = np.log(self.return_periods)
+        out = np.full(len(self.design_lives), np.nan)
+
+        for i, risk in enumerate(self.risk):
+            # Risk decreases with T, np.interp needs increasing abscissas
+            if risk[-1] <= target_risk <= risk[0]:
+                out[i] = np.exp(np.interp(target_risk, risk[::-1], log_T[::-1]))
+
+        return out
+
+
+def simulate_risk(
+    design_lives,
+    return_periods=None,
+    n_years: int = 100_000_000,
+    distribution=None,
+    chunk_size: int = 2**22,
+    rng: np.random.Generator | None = None,
+):
+    """Monte Carlo estimate of the hydrologic risk for many design lives and return periods
+
+    Annual maxima are drawn in chunks of about `chunk_size` values, so memory use
+    does not depend on `n_years`. Each chunk is a block of simulated lives of
+    `max(design_lives)` years; the running maximum along each life gives the
+    largest event in the first n years for every design life at once.
+
+    If `distribution` (e.g., a frozen `scipy.stats` distribution) is given,
+    annual maxima are drawn from it by inverse transform and compared with its
+    T-year quantiles. Otherwise the comparison is done on non-exceedance
+    probabilities, which gives the same risk for any continuous distribution.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+
+    design_lives = np.unique(np.asarray(design_lives, dtype=int))
+    if return_periods is None:
+        return_periods = np.geomspace(1.01, 1000, 200)
+    return_periods = np.sort(np.asarray(return_periods, dtype=float))
+
+    ## Exceedance thresholds of the T-year events, increasing with T
+    thresholds = 1.0 - 1.0 / return_periods
+    if distribution is not None:
+        thresholds = distribution.ppf(thresholds)
+
+    n_max = int(design_lives.max())
+    lives_per_chunk = max(1, chunk_size // n_max)
+    total_lives = max(1, n_years // n_max)
+
+    histogram = np.zeros((len(design_lives), len(return_periods) + 1), dtype=np.int64)
+
+    for start in range(0, total_lives, lives_per_chunk):
+        lives = min(lives_per_chunk, total_lives - start)
+
+        annual_max = rng.random((lives, n_max))
+        if distribution is not None:
+            annual_max = distribution.ppf(annual_max)
+
+        # Largest event within the first n years of each life
+        np.maximum.accumulate(annual_max, axis=1, out=annual_max)
+        largest = annual_max[:, design_lives - 1]  # (lives, design lives)
+
+        # Number of thresholds exceeded by the largest event of each life
+        n_exceeded = np.searchsorted(thresholds, largest, side="left")
+        offsets = np.arange(len(design_lives)) * (len(return_periods) + 1)
+        histogram += np.bincount((n_exceeded + offsets).ravel(), minlength=histogram.size).reshape(
+            histogram.shape
+        )
+
+    ## A life exceeds the T_j event if its largest event is above threshold j,
+    ## i.e., if it exceeded more than j thresholds
+    exceedances = np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    n_lives = np.full(len(design_lives), total_lives)
+
+    return RiskSimulation(design_lives, return_periods, exceedances, n_lives)
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    rng = np.random.default_rng(340)
+    design_lives = [1, 5, 10, 25, 50, 100]
+
+    tic = perf_counter()
+    simulation = simulate_risk(design_lives, n_years=100_000_000, rng=rng)
+    elapsed = perf_counter() - tic
+
+    print(f"{simulation.simulated_years:,} simulated years in {elapsed:.2f} s")
+
+    T_design = simulation.design_return_period(0.10)
+    for n, T in zip(simulation.design_lives, T_design):
+        exact = 1.0 / (1.0 - np.power(0.9, 1.0 / n))
+        print(f"n = {n:>3} years: T(R = 0.10) = {T:8.1f} (closed form {exact:8.1f})")
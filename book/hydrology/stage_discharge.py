@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Iterator
+
+__all__ = [
+    "RatingTable",
+    "prorate_shifts",
+    "apply_rating",
+    "iter_stage_chunks",
+    "convert_stage_record",
+]
+
+
+class RatingTable:
+    """Tabulated stage-discharge rating evaluated by vectorized interpolation"""
+
+    def __init__(self, stage, discharge):
+        stage = np.asarray(stage, dtype=float)
+        discharge = np.asarray(discharge, dtype=float)
+
+        order = np.argsort(stage)
+        self.stage = stage[order]  # Gage height [ft]
+        self.discharge = discharge[order]  # Discharge [ft³/s]
+
+    @classmethod
+    def from_exsa(cls, exsa: pd.DataFrame, shift_adjusted: bool = True):
+        """Build the rating from a USGS `exsa` table (`nwis.get_ratings(file_type="exsa")`)
+
+        The `DEP` column of an exsa table is already shift-adjusted with respect to
+        `INDEP`. With `shift_adjusted=False`, the base rating is recovered by moving
+        each stage by its `SHIFT` (or by `CORR - INDEP`, where `CORR` is the corrected
+        stage and `SHIFT` is missing), i.e., Q_base(H + shift) = DEP(H).
+        """
+        table = exsa.dropna(subset=["INDEP", "DEP"])
+        stage = table["INDEP"].to_numpy(dtype=float)
+
+        if not shift_adjusted:
+            if "SHIFT" in table:
+                shift = table["SHIFT"]
+            elif "CORR" in table:
+                shift = table["CORR"] - table["INDEP"]
+            else:
+                raise KeyError("The exsa table has neither a `SHIFT` nor a `CORR` column")
+            stage = stage + shift.fillna(0.0).to_numpy(dtype=float)
+
+        return cls(stage, table["DEP"].to_numpy(dtype=float))
+
+    def __call__(self, H):
+        # Stages outside the table are flagged as NaN instead of being extrapolated
+        return np.interp(H, self.stage, self.discharge, left=np.nan, right=np.nan)
+
+
+def prorate_shifts(time, shifts: pd.Series | None):
+    """Shift [ft] at each timestamp, linearly prorated between dated shift entries
+
+    `shifts` is a Series of shift values indexed by the date each shift was measured.
+    Before the first and after the last entry, the nearest shift is held constant.
+    """
+    time = pd.DatetimeIndex(time)
+
+    if shifts is None or len(shifts) == 0:
+        return np.zeros(len(time))
+
+    shifts = shifts.sort_index()
+    shift_time = pd.DatetimeIndex(shifts.index)
+
+    # Compare on a common integer time axis (ns since epoch)
+    if shift_time.tz is None and time.tz is not None:
+        shift_time = shift_time.tz_localize(time.tz)
+    elif shift_time.tz is not None and time.tz is None:
+        time = time.tz_localize(shift_time.tz)
+
+    return np.interp(
+        time.asi8.astype(float),
+        shift_time.asi8.astype(float),
+        shifts.to_numpy(dtype=float),
+    )
+
+
+def apply_rating(
+    stage: pd.Series,
+    rating: Callable,
+    shifts: pd.Series | None = None,
+):
+    """Convert a time-indexed stage series to discharge
+
+    `rating` is any vectorized callable H -> Q, e.g., a `RatingTable` or a
+    `SegmentedRating`. Time-varying `shifts` are added to the gage height first.
+    """
+    H = stage.to_numpy(dtype=float) + prorate_shifts(stage.index, shifts)
+    return pd.Series(rating(H), index=stage.index, name="discharge")
+
+
+def iter_stage_chunks(
+    path: str | Path,
+    time_col: str = "datetime",
+    stage_col: str = "00065",
+    chunksize: int = 1_000_000,
+) -> Iterator[pd.Series]:
+    """Read an instantaneous-value stage record from CSV or Parquet in chunks
+
+    Only `time_col` and `stage_col` are read. Each chunk is yielded as a stage
+    Series indexed by time.
+    """
+    path = Path(path)
+
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet records requires `pyarrow`") from e
+
+        parquet_file = pq.ParquetFile(path)
+        batches = parquet_file.iter_batches(batch_size=chunksize, columns=[time_col, stage_col])
+        chunks = (batch.to_pandas() for batch in batches)
+
+    else:
+        chunks = pd.read_csv(
+            path,
+            usecols=[time_col, stage_col],
+            chunksize=chunksize,
+            comment="#",
+        )
+
+    for chunk in chunks:
+        index = pd.to_datetime(chunk[time_col], utc=True)
+        stage = pd.to_numeric(chunk[stage_col], errors="coerce")
+        yield pd.Series(stage.to_numpy(), index=index, name=stage_col)
+
+
+def convert_stage_record(
+    source: str | Path,
+    destination: str | Path,
+    rating: Callable,
+    shifts: pd.Series | None = None,
+    time_col: str = "datetime",
+    stage_col: str = "00065",
+    chunksize: int = 1_000_000,
+):
+    """Stream a stage record through a rating and write the discharge series
+
+    Memory use is bounded by `chunksize` rows regardless of the record length.
+    The output format (CSV or Parquet) follows the `destination` suffix.
+
+    Returns the number of readings converted.
+    """
+    destination = Path(destination)
+    to_parquet = destination.suffix == ".parquet"
+    if to_parquet:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Writing Parquet records requires `pyarrow`") from e
+
+    writer = None
+    n_rows = 0
+
+    try:
+        for i, stage in enumerate(
+            iter_stage_chunks(source, time_col, stage_col, chunksize=chunksize)
+        ):
+            discharge = apply_rating(stage, rating, shifts)
+            out = pd.DataFrame(
+                {time_col: stage.index, "stage": stage.to_numpy(), "discharge": discharge.to_numpy()}
+            )
+
+            if to_parquet:
+                table = pa.Table.from_pandas(out, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(destination, table.schema, compression="zstd")
+                writer.write_table(table)
+
+            else:
+                out.to_csv(destination, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+            n_rows += len(out)
+
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return n_rows
+
+
+if __name__ == "__main__":
+    from tempfile import TemporaryDirectory
+    from time import perf_counter
+
+    rng = np.random.default_rng(340)
+    rating = RatingTable(np.arange(-2, 40, 0.01), 150 * np.power(np.arange(-2, 40, 0.01) + 2.5, 1.8))
+
+    with TemporaryDirectory() as tmp:
+        ## 10 years of 15-minute stage readings
+        time = pd.date_range("2010-01-01", periods=10 * 365 * 96, freq="15min", tz="UTC")
+        H = 5 + np.cumsum(rng.normal(0, 0.01, time.size)).clip(-5, 20)
+        pd.DataFrame({"datetime": time, "00065": H}).to_csv(f"{tmp}/stage.csv", index=False)
+
+        shifts = pd.Series([0.0, -0.3, 0.1], index=pd.to_datetime(["2010-01-01", "2014-06-01", "2019-12-31"]))
+
+        tic = perf_counter()
+        n = convert_stage_record(f"{tmp}/stage.csv", f"{tmp}/discharge.csv", rating, shifts, chunksize=250_000)
+        print(f"Converted {n:,} readings in {perf_counter() - tic:.2f} s")
@@ -0,0 +1,56 @@
+from .d8 import OFFSETS, flow_direction, receivers, upstream_index
+from .priority_flood import priority_flood
+from .store import DIRMAP, TIF_PATH, STORE_DIR, RasterStore, build_store, open_store
+from .delineation import Catchment, Delineator
+from .accumulation import (
+    accumulate,
+    d8_accumulation,
+    dinf_accumulation,
+    mfd_accumulation,
+)
+from .morphometry import Morphometry, catchment_morphometry, kerby, kirpich, nrcs_lag
+from .streams import StreamNetwork, extract_streams, strahler_order
+from .pyramid import Overview, build_overviews, overview
+from .tiled import (
+    iter_tiles,
+    tiled_fill,
+    tiled_flow_direction,
+    tiled_accumulation,
+    build_tiled_store,
+)
+
+__all__ = [
+    "DIRMAP",
+    "OFFSETS",
+    "flow_direction",
+    "receivers",
+    "upstream_index",
+    "priority_flood",
+    "TIF_PATH",
+    "STORE_DIR",
+    "RasterStore",
+    "build_store",
+    "open_store",
+    "Catchment",
+    "Delineator",
+    "accumulate",
+    "d8_accumulation",
+    "dinf_accumulation",
+    "mfd_accumulation",
+    "Morphometry",
+    "catchment_morphometry",
+    "kirpich",
+    "nrcs_lag",
+    "kerby",
+    "StreamNetwork",
+    "extract_streams",
+    "strahler_order",
+    "Overview",
+    "build_overviews",
+    "overview",
+    "iter_tiles",
+    "tiled_fill",
+    "tiled_flow_direction",
+    "tiled_accumulation",
+    "build_tiled_store",
+]
@@ -0,0 +1,131 @@
+import numpy as np
+
+__all__ = [
+    "DIRMAP",
+    "OFFSETS",
+    "direction_index",
+    "flow_direction",
+    "receivers",
+    "upstream_index",
+    "gather_ranges",
+]
+
+DIRMAP = (64, 128, 1, 2, 4, 8, 16, 32)  # D8 codes of N, NE, E, SE, S, SW, W, NW
+OFFSETS = np.array([(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)])
+
+
+def _index_dtype(size: int):
+    return np.int32 if size < 2**31 - 1 else np.int64
+
+
+def direction_index(fdir, dirmap=DIRMAP):
+    """Position 0-7 of every D8 code in `dirmap` (and in `OFFSETS`), -1 for other codes"""
+    lookup = np.full(max(dirmap) + 1, -1, dtype=np.int8)
+    lookup[list(dirmap)] = np.arange(8)
+    code = np.asarray(fdir).astype(np.int64, copy=False)
+    return np.where((code >= 0) & (code <= max(dirmap)), lookup[np.clip(code, 0, max(dirmap))], -1)
+
+
+def receivers(fdir, dirmap=DIRMAP):
+    """Flat index of the cell each cell drains into, -1 where it does not drain
+
+    Cells whose D8 code is not in `dirmap` (pits, flats, no data) and cells
+    draining off the edge of the raster have no receiver.
+    """
+    fdir = np.asarray(fdir)
+    rows, cols = fdir.shape
+    dtype = _index_dtype(fdir.size)
+    d = direction_index(fdir, dirmap)
+
+    i, j = np.indices(fdir.shape, dtype=dtype)
+    i_to = i + np.where(d >= 0, OFFSETS[d, 0], 0).astype(dtype)
+    j_to = j + np.where(d >= 0, OFFSETS[d, 1], 0).astype(dtype)
+
+    inside = (d >= 0) & (i_to >= 0) & (i_to < rows) & (j_to >= 0) & (j_to < cols)
+    return np.where(inside, i_to * cols + j_to, -1).astype(dtype).ravel()
+
+
+def upstream_index(fdir, dirmap=DIRMAP):
+    """Inverse of the D8 graph in compressed sparse row form
+
+    The cells draining into cell k are `cells[offsets[k]:offsets[k + 1]]`.
+    Since every cell drains into at most one other, `cells` has at most one
+    entry per cell and the index takes about as much memory as two copies of
+    the raster in int32.
+    """
+    receiver = receivers(fdir, dirmap)
+    donors = np.flatnonzero(receiver >= 0).astype(receiver.dtype)
+    targets = receiver[donors]
+
+    order = np.argsort(targets, kind="stable")
+    counts = np.bincount(targets, minlength=receiver.size)
+    offsets = np.zeros(receiver.size + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, donors[order]
+
+
+def gather_ranges(values, starts, stops):
+    """Concatenation of values[starts[i]:stops[i]] over all i, without a Python loop"""
+    counts = stops - starts
+    total = int(counts.sum())
+    if total == 0:
+        return values[:0]
+    shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return values[np.arange(total) + shift]
+
+
+def flow_direction(dem, cell_size=(1.0, 1.0), flat_iterations: int = 0, dirmap=DIRMAP):
+    """D8 flow directions of a DEM: each cell drains to its steepest lower neighbor
+
+    `cell_size` is (dx, dy), so diagonal drops are divided by √(dx² + dy²).
+    NaN cells (no data) are outlets that any neighbor can drain into, while
+    the outside of the array is never drained into. Cells with no lower
+    neighbor get code 0.
+
+    With `flat_iterations > 0`, cells on a flat drain towards an equal
+    neighbor that already drains, one ring of the flat per iteration, so
+    flats up to that many cells from their outlet are resolved. The result
+    only depends on the cells within `flat_iterations + 1` of each cell,
+    which is what makes it tileable with a halo of that width.
+    """
+    dem = np.asarray(dem, dtype=float)
+    rows, cols = dem.shape
+    dx, dy = cell_size
+    nodata = np.isnan(dem)
+
+    padded = np.pad(np.where(nodata, -np.inf, dem), 1, constant_values=np.inf)
+    codes = np.asarray(dirmap, dtype=np.uint8)
+
+    steepest = np.zeros((rows, cols))
+    fdir = np.zeros((rows, cols), dtype=np.uint8)
+    neighbors = []
+
+    for k, (di, dj) in enumerate(OFFSETS):
+        neighbor = padded[1 + di : 1 + di + rows, 1 + dj : 1 + dj + cols]
+        neighbors.append(neighbor)
+        with np.errstate(invalid="ignore"):
+            slope = (dem - neighbor) / np.hypot(di * dy, dj * dx)
+        better = slope > steepest
+        steepest = np.where(better, slope, steepest)
+        fdir[better] = codes[k]
+
+    fdir[nodata] = 0
+
+    ## Flats: grow drainage inwards from the cells of the flat that already drain
+    for _ in range(flat_iterations):
+        undrained = (fdir == 0) & ~nodata
+        if not undrained.any():
+            break
+
+        drained = np.pad(fdir > 0, 1, constant_values=False)
+        update = np.zeros((rows, cols), dtype=np.uint8)
+        for k, (di, dj) in enumerate(OFFSETS):
+            target = drained[1 + di : 1 + di + rows, 1 + dj : 1 + dj + cols]
+            pick = undrained & (update == 0) & target & (neighbors[k] == dem)
+            update[pick] = codes[k]
+
+        if not update.any():
+            break
+        fdir = np.where(update > 0, update, fdir)
+
+    return fdir
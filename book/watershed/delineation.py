@@ -0,0 +1,181 @@
+import numpy as np
+
+from .d8 import gather_ranges, upstream_index
+from .store import RasterStore
+
+__all__ = [
+    "Catchment",
+    "Delineator",
+]
+
+
+class Catchment:
+    """Cells draining to an outlet, as found by an upstream traversal of the D8 graph
+
+    `cells` are flat indices into the raster in breadth-first order from the
+    outlet, and `distance[i]` is the number of D8 steps from `cells[i]` to the
+    outlet. Gridded results only cover the bounding `window` of the catchment.
+    """
+
+    def __init__(self, store: RasterStore, outlet: int, cells, distance):
+        self.store = store
+        self.outlet = outlet
+        self.cells = cells
+        self.distance = distance
+        self.rows, self.cols = np.divmod(cells, store.shape[1])
+
+    def __repr__(self):
+        return f"Catchment(outlet={self.outlet}, cells={len(self.cells)})"
+
+    def __len__(self):
+        return len(self.cells)
+
+    @property
+    def outlet_xy(self):
+        return self.store.xy(*divmod(self.outlet, self.store.shape[1]))
+
+    @property
+    def window(self):
+        """Row and column slices of the bounding box of the catchment"""
+        return (
+            slice(self.rows.min(), self.rows.max() + 1),
+            slice(self.cols.min(), self.cols.max() + 1),
+        )
+
+    @property
+    def extent(self):
+        """(left, right, bottom, top) of the window, as `imshow` takes it"""
+        rows, cols = self.window
+        a, _, c, _, e, f = self.store.transform
+        return c + a * cols.start, c + a * cols.stop, f + e * rows.stop, f + e * rows.start
+
+    def grid(self, values, fill=np.nan):
+        """Values of the catchment cells over the window, `fill` elsewhere"""
+        rows, cols = self.window
+        out = np.full((rows.stop - rows.start, cols.stop - cols.start), fill, dtype=float)
+        out[self.rows - rows.start, self.cols - cols.start] = values
+        return out
+
+    def mask(self):
+        return self.grid(1.0, fill=0.0).astype(bool)
+
+    def distance_grid(self):
+        return self.grid(self.distance)
+
+
+class Delineator:
+    """Catchments and distances to the outlet from the flow directions of a store
+
+    The inverse D8 graph lists the donors of every cell, so collecting a
+    catchment is a breadth-first search that only visits its own cells: the
+    cost does not depend on the size of the raster. The graph is read from
+    the store, or built once and saved there if it is missing.
+    """
+
+    def __init__(self, store: RasterStore):
+        self.store = store
+
+        if "upstream_offsets" in store.meta["layers"]:
+            self.offsets = store.layer("upstream_offsets")
+            self.donors = store.layer("upstream_cells")
+        else:
+            self.offsets, self.donors = upstream_index(store.fdir)
+            try:
+                store.save_layer("upstream_offsets", self.offsets)
+                store.save_layer("upstream_cells", self.donors)
+            except OSError:
+                pass  # A read-only store only costs rebuilding the index
+
+    def snap(self, x, y, threshold: float = 1000, radius: int = 25):
+        """Flat index of the nearest cell with accumulation above `threshold`
+
+        Only a window of `radius` cells around the point is searched; if no
+        cell there is above the threshold, the cell under the point is used.
+        """
+        rows, cols = self.store.shape
+        row, col = (int(v) for v in self.store.rowcol(x, y))
+        if not (0 <= row < rows and 0 <= col < cols):
+            raise ValueError(f"Point ({x}, {y}) is outside the raster")
+
+        r0, c0 = max(row - radius, 0), max(col - radius, 0)
+        window = self.store.acc[r0 : row + radius + 1, c0 : col + radius + 1]
+        i, j = np.nonzero(window > threshold)
+
+        if not len(i):
+            return row * cols + col
+
+        nearest = np.argmin((i + r0 - row) ** 2 + (j + c0 - col) ** 2)
+        return (i[nearest] + r0) * cols + (j[nearest] + c0)
+
+    def upstream(self, outlet: int):
+        """Cells draining to `outlet` and their distance to it, in D8 steps"""
+        frontier = np.array([outlet], dtype=np.int64)
+        levels = []
+
+        while frontier.size:
+            levels.append(frontier)
+            frontier = gather_ranges(
+                self.donors, self.offsets[frontier], self.offsets[frontier + 1]
+            )
+
+        distance = np.repeat(np.arange(len(levels)), [len(level) for level in levels])
+        return np.concatenate(levels), distance
+
+    def catchment(self, x, y, threshold: float = 1000, radius: int = 25) -> Catchment:
+        """Catchment of the point (x, y), snapped to the nearest stream cell"""
+        outlet = int(self.snap(x, y, threshold, radius))
+        cells, distance = self.upstream(outlet)
+        return Catchment(self.store, outlet, cells, distance)
+
+
+if __name__ == "__main__":
+    import json
+    import tempfile
+    from pathlib import Path
+    from time import perf_counter
+
+    from .d8 import DIRMAP
+    from .store import STORE_VERSION
+
+    ## Synthetic valley: both hillsides drain towards the center column (E/SE or W/SW),
+    ## which drains south
+    rng = np.random.default_rng(340)
+    rows, cols = 4_000, 4_001
+    N, NE, E, SE, S, SW, W, NW = DIRMAP
+    fdir = np.empty((rows, cols), dtype=np.uint8)
+    fdir[:, : cols // 2] = rng.choice([E, SE], size=(rows, cols // 2))
+    fdir[:, cols // 2 + 1 :] = rng.choice([W, SW], size=(rows, cols // 2))
+    fdir[:, cols // 2] = S
+    acc = np.ones((rows, cols), dtype=np.uint32)
+
+    path = Path(tempfile.mkdtemp())
+    meta = {
+        "version": STORE_VERSION,
+        "source": "synthetic",
+        "shape": [rows, cols],
+        "transform": [1.0, 0.0, 0.0, 0.0, -1.0, float(rows)],
+        "crs": "LOCAL_CS[]",
+        "nodata": None,
+        "layers": [],
+    }
+    with open(path / "meta.json", "w") as f:
+        json.dump(meta, f)
+
+    store = RasterStore(path, meta)
+    store.save_layer("fdir", fdir)
+    store.save_layer("acc", acc)
+
+    tic = perf_counter()
+    delineator = Delineator(RasterStore.open(path))
+    print(f"Inverse D8 index of {rows * cols:,} cells in {perf_counter() - tic:.2f} s")
+
+    delineator = Delineator(RasterStore.open(path))
+    for row in (100, 1_000, rows - 1):
+        x, y = delineator.store.xy(row, cols // 2)
+        tic = perf_counter()
+        catchment = delineator.catchment(x, y, threshold=0)
+        elapsed = perf_counter() - tic
+        print(
+            f"Catchment of row {row}: {len(catchment):,} cells, "
+            f"{catchment.distance.max()} steps long, in {1e3 * elapsed:.1f} ms"
+        )
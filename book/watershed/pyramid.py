@@ -0,0 +1,152 @@
+import numpy as np
+import warnings
+from collections import namedtuple
+
+from .store import RasterStore
+
+__all__ = [
+    "Overview",
+    "build_overviews",
+    "overview",
+]
+
+Overview = namedtuple("Overview", ["data", "extent", "factor"])
+
+REDUCERS = {"mean": np.nanmean, "max": np.nanmax}
+LAYER_REDUCERS = {"dem": "mean", "acc": "max"}  # Streams stay visible when acc keeps the block max
+
+
+def _halve(source, destination, reduce: str, chunk_rows: int = 1024):
+    """Write the 2 × 2 block mean (or max) of `source` into `destination`, a few rows at a time"""
+    rows, cols = source.shape
+    reducer = REDUCERS[reduce]
+
+    for r0 in range(0, rows, 2 * chunk_rows):
+        block = np.asarray(source[r0 : r0 + 2 * chunk_rows], dtype=float)
+        h, w = block.shape
+
+        ## Odd edges are padded with NaN, which the reducers ignore
+        block = np.pad(block, ((0, h % 2), (0, w % 2)), constant_values=np.nan)
+        block = block.reshape(block.shape[0] // 2, 2, block.shape[1] // 2, 2)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN blocks stay NaN
+            reduced = reducer(block, axis=(1, 3))
+
+        if np.issubdtype(destination.dtype, np.integer):
+            reduced = np.nan_to_num(reduced)
+        destination[r0 // 2 : r0 // 2 + reduced.shape[0]] = reduced
+
+
+def build_overviews(store: RasterStore, layers=("dem", "acc"), min_size: int = 256):
+    """Halve each layer repeatedly until it fits in `min_size` cells, and save every level
+
+    Level k is stored as layer "<name>_<2^k>" and each level is computed from
+    the previous one, so the whole pyramid costs about one third of a pass
+    over the full raster, with memory bounded by a block of rows.
+    """
+    overviews = store.meta.setdefault("overviews", {})
+
+    for name in layers:
+        reduce = LAYER_REDUCERS.get(name, "mean")
+        source = store.layer(name)
+        factor, factors = 1, []
+
+        while max(source.shape) > min_size:
+            factor *= 2
+            shape = (-(-source.shape[0] // 2), -(-source.shape[1] // 2))
+            level = store.new_layer(f"{name}_{factor}", shape, source.dtype)
+            _halve(source, level, reduce)
+            level.flush()
+            source = level
+            factors.append(factor)
+
+        overviews[name] = factors
+
+    store.save_meta()
+    return store
+
+
+def overview(store: RasterStore, name: str = "dem", size=(800, 600)) -> Overview:
+    """Coarsest level of a layer with at least `size` = (width, height) pixels
+
+    The cost of drawing the result only depends on the display size and not
+    on the size of the raster. Falls back to the full-resolution layer when
+    the store has no overviews.
+    """
+    rows, cols = store.shape
+    width, height = size
+
+    factor = 1
+    for candidate in store.meta.get("overviews", {}).get(name, []):
+        if -(-cols // candidate) >= width and -(-rows // candidate) >= height:
+            factor = candidate
+
+    data = store.layer(name if factor == 1 else f"{name}_{factor}")
+
+    a, _, c, _, e, f = store.transform
+    left, top = c, f
+    right, bottom = c + a * factor * data.shape[1], f + e * factor * data.shape[0]
+    return Overview(data, (left, right, bottom, top), factor)
+
+
+if __name__ == "__main__":
+    import json
+    import tempfile
+    from pathlib import Path
+    from time import perf_counter
+
+    from matplotlib.colors import LightSource
+    from scipy.ndimage import gaussian_filter
+
+    from .store import STORE_VERSION
+
+    rng = np.random.default_rng(340)
+    path = Path(tempfile.mkdtemp())
+
+    for rows in (1_000, 3_000, 8_000):
+        ## Synthetic DEM written in blocks of rows, as a large raster would be
+        cols = rows
+        meta = {
+            "version": STORE_VERSION,
+            "source": "synthetic",
+            "shape": [rows, cols],
+            "transform": [1.0, 0.0, 0.0, 0.0, -1.0, float(rows)],
+            "crs": "LOCAL_CS[]",
+            "nodata": None,
+            "layers": ["dem"],
+        }
+        store_dir = path / str(rows)
+        store_dir.mkdir()
+        with open(store_dir / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+        dem = np.lib.format.open_memmap(
+            store_dir / "dem.npy", mode="w+", dtype=np.float32, shape=(rows, cols)
+        )
+        for r0 in range(0, rows, 1_000):
+            block = gaussian_filter(rng.normal(size=(1_000, cols)), 8) * 100
+            dem[r0 : r0 + 1_000] = block[: rows - r0] + np.linspace(0, 500, cols)
+        dem.flush()
+        del dem
+
+        store = RasterStore.open(store_dir)
+        tic = perf_counter()
+        build_overviews(store, layers=("dem",))
+        built = perf_counter() - tic
+
+        store = RasterStore.open(store_dir)
+        tic = perf_counter()
+        level = overview(store, "dem", (800, 600))
+        shaded = LightSource(azdeg=315, altdeg=45).hillshade(np.asarray(level.data), vert_exag=0.5)
+        drawn = perf_counter() - tic
+
+        tic = perf_counter()
+        LightSource(azdeg=315, altdeg=45).hillshade(np.asarray(store.dem), vert_exag=0.5)
+        full = perf_counter() - tic
+
+        print(
+            f"{rows:>6} × {cols} DEM: pyramid built in {built:.2f} s, "
+            f"hillshade from 1/{level.factor} overview {shaded.shape} in {1e3 * drawn:.0f} ms "
+            f"(full resolution {full:.2f} s)"
+        )
@@ -0,0 +1,218 @@
+import json
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+
+from .accumulation import d8_accumulation
+from .d8 import DIRMAP, upstream_index
+from .priority_flood import priority_flood
+
+__all__ = [
+    "DIRMAP",
+    "TIF_PATH",
+    "STORE_DIR",
+    "RasterStore",
+    "build_store",
+    "open_store",
+]
+
+TIF_PATH = Path("book/assets/dem/clipped.tif")
+STORE_DIR = Path("book/assets/dem/store")
+STORE_VERSION = 4  # Bump when the layers of the store, or how they are computed, change
+
+
+class RasterStore:
+    """Conditioned DEM, D8 flow directions and flow accumulation of one raster
+
+    Every layer is a `.npy` file opened with `mmap_mode="r"`, so opening a
+    store only reads the small `meta.json` next to them; the operating system
+    pages in the cells that are actually used. `transform` holds the six
+    coefficients (a, b, c, d, e, f) of the affine transform of the raster,
+    with x = c + a·col and y = f + e·row at the upper-left corner of a cell.
+    """
+
+    def __init__(self, path: str | Path, meta: dict):
+        self.path = Path(path)
+        self.meta = meta
+        self.shape = tuple(meta["shape"])
+        self.transform = tuple(meta["transform"])
+        self.crs = meta["crs"]
+        self.nodata = meta["nodata"]
+        self._layers = {}
+
+    def __repr__(self):
+        return f"RasterStore({str(self.path)!r}, shape={self.shape}, layers={self.meta['layers']})"
+
+    @classmethod
+    def open(cls, path: str | Path = STORE_DIR):
+        path = Path(path)
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(
+                f"Store at {path} has version {meta.get('version')}, expected {STORE_VERSION}. "
+                "Rebuild it with `python -m book.watershed.store`"
+            )
+
+        return cls(path, meta)
+
+    def layer(self, name: str) -> np.ndarray:
+        """Read-only memory map of a layer, e.g. "dem", "fdir" or "acc" """
+        if name not in self._layers:
+            self._layers[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+        return self._layers[name]
+
+    @property
+    def dem(self):
+        return self.layer("dem")
+
+    @property
+    def fdir(self):
+        return self.layer("fdir")
+
+    @property
+    def acc(self):
+        return self.layer("acc")
+
+    @property
+    def cell_size(self):
+        a, _, _, _, e, _ = self.transform
+        return a, -e
+
+    @property
+    def bounds(self):
+        """(left, bottom, right, top) of the raster"""
+        a, _, c, _, e, f = self.transform
+        rows, cols = self.shape
+        return c, f + e * rows, c + a * cols, f
+
+    @property
+    def extent(self):
+        """(left, right, bottom, top), as `imshow` takes it"""
+        left, bottom, right, top = self.bounds
+        return left, right, bottom, top
+
+    def rowcol(self, x, y):
+        """Row and column of the cells containing the points (x, y)"""
+        a, _, c, _, e, f = self.transform
+        return (
+            np.floor((np.asarray(y) - f) / e).astype(int),
+            np.floor((np.asarray(x) - c) / a).astype(int),
+        )
+
+    def xy(self, row, col):
+        """Coordinates of the centers of cells"""
+        a, _, c, _, e, f = self.transform
+        return c + a * (np.asarray(col) + 0.5), f + e * (np.asarray(row) + 0.5)
+
+    def save_layer(self, name: str, array: np.ndarray):
+        """Write a new layer next to the others and register it in `meta.json`"""
+        np.save(self.path / f"{name}.npy", np.ascontiguousarray(array))
+        self._layers.pop(name, None)
+
+        if name not in self.meta["layers"]:
+            self.meta["layers"].append(name)
+        self.save_meta()
+
+    def new_layer(self, name: str, shape, dtype) -> np.ndarray:
+        """Writable memory map for a new layer, registered in `meta.json`"""
+        layer = np.lib.format.open_memmap(
+            self.path / f"{name}.npy", mode="w+", dtype=dtype, shape=tuple(shape)
+        )
+        self._layers.pop(name, None)
+
+        if name not in self.meta["layers"]:
+            self.meta["layers"].append(name)
+        self.save_meta()
+        return layer
+
+    def save_meta(self):
+        with open(self.path / "meta.json", "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+
+def build_store(tif_path: str | Path = TIF_PATH, store_dir: str | Path = STORE_DIR):
+    """Condition a DEM once and write it, its flow directions and accumulation to `store_dir`
+
+    This is the slow part of watershed delineation, so it is meant to run
+    offline (`python -m book.watershed.store`) and not on the server. The
+    DEM is copied into the store as float32 and filled in place by
+    `priority_flood`, whose ε gradients also drain the flats. Flow
+    directions are stored as uint8 D8 codes (0 where a cell does not drain,
+    i.e. outlets on the edge and no data), the accumulation from
+    `d8_accumulation` as uint32 cell counts, and the inverse D8 graph from
+    `upstream_index`.
+    """
+    import rasterio
+    from rasterio.windows import Window
+
+    from .pyramid import build_overviews
+    from .tiled import tiled_flow_direction
+
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    with rasterio.open(tif_path) as src:
+        meta = {
+            "version": STORE_VERSION,
+            "source": Path(tif_path).name,
+            "shape": [src.height, src.width],
+            "transform": list(src.transform)[:6],
+            "crs": src.crs.to_string(),
+            "nodata": src.nodata,
+            "layers": [],
+        }
+
+        with open(store_dir / "meta.json", "w") as f:
+            json.dump(meta, f, indent=2)
+        store = RasterStore(store_dir, meta)
+
+        ## Copy the DEM a block of rows at a time, with no data as NaN
+        dem = store.new_layer("dem", (src.height, src.width), np.float32)
+        for r0 in range(0, src.height, 1024):
+            window = Window(0, r0, src.width, min(1024, src.height - r0))
+            block = src.read(1, window=window).astype(np.float32)
+            if src.nodata is not None:
+                block[block == src.nodata] = np.nan
+            dem[r0 : r0 + block.shape[0]] = block
+
+    ## Fill depressions and drain flats in a single pass
+    priority_flood(dem)
+    dem.flush()
+
+    fdir = store.new_layer("fdir", dem.shape, np.uint8)
+    tiled_flow_direction(dem, fdir, cell_size=store.cell_size, flat_iterations=0)
+    fdir.flush()
+
+    store.save_layer("acc", np.rint(d8_accumulation(fdir)).astype(np.uint32))
+
+    ## Inverse D8 graph, for upstream traversals that only visit a catchment
+    offsets, cells = upstream_index(store.fdir)
+    store.save_layer("upstream_offsets", offsets)
+    store.save_layer("upstream_cells", cells)
+
+    ## Display-size copies of the DEM and accumulation
+    return build_overviews(store)
+
+
+@lru_cache
+def open_store(path: str | Path = STORE_DIR) -> RasterStore:
+    """Shared `RasterStore`, opened once per process"""
+    return RasterStore.open(path)
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    tic = perf_counter()
+    store = build_store()
+    print(f"Store built in {perf_counter() - tic:.1f} s: {store}")
+
+    tic = perf_counter()
+    store = RasterStore.open(STORE_DIR)
+    dem, fdir, acc = store.dem, store.fdir, store.acc
+    print(f"Store opened in {1e3 * (perf_counter() - tic):.1f} ms")
+
+    size = sum((store.path / f"{name}.npy").stat().st_size for name in store.meta["layers"])
+    print(f"{store.shape[0]} × {store.shape[1]} cells, {size / 2**20:.0f} MiB on disk")
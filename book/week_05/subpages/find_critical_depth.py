@@ -48,11 +48,14 @@ def find_critical_depth():
     )
 
     with st.echo():
+        from book.channels import TrapezoidalSection
+
         g = 9.81  # - m/s²
 
         def critical_depth_trapezoid(yc, b, m, Q):
-            area = (b + m * yc) * yc
-            hyd_depth = area / (b + 2 * m * yc)
+            section = TrapezoidalSection(b, m)
+            area = section.area(yc)
+            hyd_depth = section.hydraulic_depth(yc)
             return (Q**2) / g - (area**2 * hyd_depth)
 
     st.markdown(
@@ -96,6 +99,47 @@ def find_critical_depth():
                 method=method,
             )
 
+    st.markdown(
+        R"""
+        ****
+        ## 🛟 A solver that does not need a guess
+
+        `root` walks from the initial guess and can wander off to a negative or
+        meaningless depth. But $A^2 D_h = A^3/T$ only grows with $y$, so the
+        critical depth is always *bracketed* between $y = 0$ and any depth where
+        the residual changes sign. A Newton step is accepted only if it lands
+        inside the bracket; otherwise the bracket is halved. The bracket shrinks
+        every iteration, so the solver always converges.
+        """
+    )
+
+    with st.echo():
+        from book.channels import critical_depth
+
+        y_c_bracketed = critical_depth(TrapezoidalSection(bottom_width, side_slope), flow_rate)
+
+    st.markdown(
+        R"""
+        ****
+        ## ⚡ Precomputed dimensionless solution
+
+        With $\eta = my_c/b$, the critical depth equation of a trapezoid becomes
+
+        $$
+            \dfrac{Q\,m^{1.5}}{g^{0.5}\,b^{2.5}} = \dfrac{\left[\eta(1+\eta)\right]^{1.5}}{(1 + 2\eta)^{0.5}}
+        $$
+
+        The right-hand side only depends on $\eta$, so it can be tabulated once
+        for every channel. A spline through the table gives $\eta$ and one
+        Newton step polishes it to machine precision, in a few microseconds.
+        """
+    )
+
+    with st.echo():
+        from book.channels import depth_lookup
+
+        y_c_lookup = depth_lookup().critical_depth(flow_rate, bottom_width, side_slope)
+
     st.markdown(
         R"""
         ****
@@ -103,7 +147,8 @@ def find_critical_depth():
         """
     )
 
-    cols = st.columns(2)
+    ## The `root` result first, then the bracketed solver and the lookup to compare with
+    cols = st.columns(4)
 
     with cols[0]:
         st.metric(r"$y_{c, \textsf{ guess}}$", f"{initial_guess:.2f} m")
@@ -120,6 +165,12 @@ def find_critical_depth():
                 icon="🧪",
             )
 
+    with cols[2]:
+        st.metric(r"$y_c$ (bracketed)", f"{y_c_bracketed:.2f} m")
+
+    with cols[3]:
+        st.metric(r"$y_c$ (lookup)", f"{y_c_lookup:.2f} m")
+
 
 if __name__ == "__main__":
     find_critical_depth()
@@ -641,6 +641,55 @@ def page_week_06(option: TOC):
 
             st.plotly_chart(fig, use_container_width=True)
 
+        st.markdown(
+            R"""
+            ****
+            ### Where does the jump happen?
+
+            Downstream of a sluice gate on a mild channel, the flow leaves the gate
+            supercritical and rises along an $\mathtt{M3}$ profile, while the
+            downstream control imposes a subcritical profile. The jump sits where
+            both profiles carry the same specific force $M$.
+            """
+        )
+
+        cols = st.columns([1, 2])
+
+        with cols[0]:
+            gate_opening = st.slider("Depth below the gate [m]", 0.1, 0.8, 0.3, 0.05)
+            tailwater = st.slider("Tailwater depth [m]", 1.0, 3.0, 2.0, 0.1)
+            slope = st.slider(
+                "Bottom slope -- $S_0$ [-]", 0.0001, 0.0050, 0.0010, 0.0001, format="%.4f"
+            )
+
+        with cols[1]:
+            with st.echo():
+                from book.channels import RectangularSection, locate_jump
+
+                jump = locate_jump(
+                    RectangularSection(3.0),
+                    Q=10.0,
+                    n=0.015,
+                    S0=slope,
+                    y_upstream=gate_opening,
+                    y_downstream=tailwater,
+                    length=200.0,
+                )
+
+        if jump.location[0] == "reach":
+            cols = st.columns(3)
+            cols[0].metric("Jump location", f"{jump.x[0]:.1f} m")
+            cols[1].metric("$y_1$", f"{jump.y1[0]:.2f} m")
+            cols[2].metric("$y_2$", f"{jump.y2[0]:.2f} m")
+        elif jump.location[0] == "upstream":
+            st.warning("The tailwater drowns the gate: there is no jump.", icon="🌊")
+        elif jump.location[0] == "downstream":
+            st.warning("The jump is swept out of the reach.", icon="🏄")
+        else:
+            st.warning("The profiles could not be computed: the jump is undetermined.", icon="🧪")
+
+        st.pyplot(plot_jump(jump))
+
     elif option == "Uniform flow":
         st.markdown(
             R"""
@@ -746,6 +795,7 @@ def page_week_06(option: TOC):
         with cols[1]:  ## Function def
             st.markdown("#### Define equation to solve")
             with st.echo():
+                from book.channels import RectangularSection
 
                 def solve_normal_depth_rect_channel(
                     depth: float,
@@ -755,9 +805,9 @@ def page_week_06(option: TOC):
                     slope: float,
                 ):
                     k = 1.0  ## SI Units
-                    area = width * depth
-                    wetted_perim = width + 2 * depth
-                    hydr_radius = area / wetted_perim
+                    section = RectangularSection(width)
+                    area = section.area(depth)
+                    hydr_radius = section.hydraulic_radius(depth)
                     calculated_discharge = (
                         k / n_manning * area * np.power(hydr_radius, 2 / 3) * np.sqrt(slope)
                     )
@@ -775,6 +825,14 @@ def page_week_06(option: TOC):
                     method=method,
                 )
 
+            st.markdown("#### Or use a bracketed solver")
+            with st.echo():
+                from book.channels import normal_depth as bracketed_normal_depth
+
+                y_n = bracketed_normal_depth(
+                    RectangularSection(width), discharge, n_manning, slope
+                )
+
         with cols[0]:
             st.divider()
             if normal_depth.success:
@@ -787,6 +845,7 @@ def page_week_06(option: TOC):
                     """,
                     icon="🧪",
                 )
+            st.metric(R"*Bracketed* $\; y_n$", f"{y_n:.2f} m")
 
         st.markdown(
             R"""
@@ -957,6 +1016,43 @@ def page_week_06(option: TOC):
             """
         )
 
+        st.markdown(
+            R"""
+            *****
+
+            ## Profile families
+
+            A backwater curve behind a dam changes with the discharge. Computing
+            the profiles of many flows at once gives a table of depths with one
+            row per discharge and one column per station, ready to map the
+            flooded area for each flow.
+            """
+        )
+
+        cols = st.columns([1, 2])
+
+        with cols[0]:
+            pool_depth = st.slider("Depth at the dam [m]", 2.0, 10.0, 6.0, 0.5, format="%.1f")
+            reach_length = st.slider("Reach length [km]", 5, 50, 20, 5)
+
+        with cols[1]:
+            with st.echo():
+                from book.channels import TrapezoidalSection, profile_family
+
+                section = TrapezoidalSection(b=10.0, m=2.0)
+                discharges = np.linspace(10.0, 300.0, 12)  # [m³/s]
+
+                family = profile_family(
+                    section,
+                    discharges,
+                    n=0.035,
+                    S0=0.0005,  # Bottom drops 0.5 m per km
+                    y_boundary=pool_depth,
+                    length=1000 * reach_length,
+                )
+
+        st.pyplot(plot_profile_family(family))
+
     elif option == "Rivers":
         st.subheader(
             R"🏞️ $\quad \textsf{Water} + \textsf{sediments} + \textsf{movement} = \textsf{river}$",
@@ -1890,6 +1986,41 @@ def draw_hydraulic_jump():
     return fig
 
 
+def plot_jump(jump):
+    fig, ax = plt.subplots(figsize=[8, 3])
+    ax.plot(jump.stations, jump.y_super[0], c="orange", ls="dotted", label="Supercritical profile")
+    ax.plot(jump.stations, jump.y_sub[0], c="purple", ls="dotted", label="Subcritical profile")
+    ax.plot(jump.stations, jump.depth[0], c="navy", lw=3, label="Water surface")
+
+    ax.set_xlabel("Distance from the gate -- $x$ [m]")
+    ax.set_ylabel("Depth -- $y$ [m]")
+    ax.legend(fontsize=8)
+    ax.set_xlim(jump.stations[0], jump.stations[-1])
+    ax.set_ylim(bottom=0)
+    ax.grid(True, color="lightgray")
+    ax.spines.right.set_visible(False)
+    ax.spines.top.set_visible(False)
+    return fig
+
+
+def plot_profile_family(family):
+    fig, ax = plt.subplots(figsize=[8, 4])
+    colors = plt.cm.Blues(np.linspace(0.35, 1.0, len(family.Q)))
+
+    for Q, depth, kind, color in zip(family.Q, family.depth, family.types, colors):
+        ax.plot(family.stations / 1000, depth, c=color, label=f"{Q:.0f} m³/s ({kind})")
+
+    ax.set_xlabel("Distance upstream of the dam [km]")
+    ax.set_ylabel("Depth -- $y$ [m]")
+    ax.legend(fontsize=7, ncols=2, title="Discharge", title_fontsize=8)
+    ax.set_xlim(0, family.stations[-1] / 1000)
+    ax.set_ylim(bottom=0)
+    ax.grid(True, color="lightgray")
+    ax.spines.right.set_visible(False)
+    ax.spines.top.set_visible(False)
+    return fig
+
+
 def FGV_intuition(
     S0: float,
     Se: float,
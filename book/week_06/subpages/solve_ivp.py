@@ -29,6 +29,7 @@ def solve_ivp():
     )
 
     with st.echo():
+        from book.channels import TrapezoidalSection
 
         def normal_depth_trapezoidal_section(
             y: float,  # Depth [m]
@@ -38,9 +39,9 @@ def solve_ivp():
             m: float,  # Side slope [-]
             nMan: float,  # Manning coefficient [-]
         ):
-            A = (b + m * y) * y  # Area
-            Pm = b + 2 * y * np.sqrt(1 + m**2)  # Wetted perimeter
-            Rh = A / Pm  # Hydraulic radius
+            section = TrapezoidalSection(b, m)
+            A = section.area(y)  # Area
+            Rh = section.hydraulic_radius(y)  # Hydraulic radius
             return Q - 1.0 / nMan * A * Rh ** (2 / 3) * np.sqrt(S0)
 
     st.markdown("#### $y_c$")
@@ -53,8 +54,9 @@ def solve_ivp():
             b: float,  # Bottom width [m]
             m: float,  # Side slope [-]
         ):
-            A = (b + m * y) * y  # Area
-            T = b + 2 * m * y  # Top width
+            section = TrapezoidalSection(b, m)
+            A = section.area(y)  # Area
+            T = section.top_width(y)  # Top width
             g = 9.81  # SI Units
             return 1 - (Q**2 * T) / (g * A**3)
 
@@ -114,9 +116,18 @@ def solve_ivp():
                     ),
                 )
 
+        with st.expander("🛟 Bracketed solver"):
+            with st.echo():
+                from book.channels import normal_depth as bracketed_normal_depth
+
+                section = TrapezoidalSection(width, side_slope)
+                y_n = bracketed_normal_depth(section, discharge, n_manning, -bottom_slope)
+
         with normaldepth_container.container():
             if normal_depth.success:
                 st.metric(R"$\; y_n$", f"{normal_depth.x[0]:.2f} m")
+            else:
+                st.metric(R"$\; y_n$ (bracketed)", f"{y_n:.2f} m")
 
         st.divider()
 
@@ -142,9 +153,17 @@ def solve_ivp():
                     ),
                 )
 
+        with st.expander("🛟 Bracketed solver"):
+            with st.echo():
+                from book.channels import critical_depth as bracketed_critical_depth
+
+                y_c = bracketed_critical_depth(section, discharge)
+
         with critdepth_container.container():
             if critical_depth.success:
                 st.metric(R"$\; y_c$", f"{critical_depth.x[0]:.2f} m")
+            else:
+                st.metric(R"$\; y_c$ (bracketed)", f"{y_c:.2f} m")
 
     st.markdown(
         R"""
@@ -164,10 +183,10 @@ def solve_ivp():
             m: float,  # Side slope [-]
             nMan: float,  # Manning coefficient [-]
         ):
-            A = (b + m * y) * y  # Area
-            T = b + 2 * m * y  # Top width
-            Pm = b + 2 * y * np.sqrt(1 + m**2)  # Wetted perimeter
-            Rh = A / Pm  # Hydraulic radius
+            section = TrapezoidalSection(b, m)
+            A = section.area(y)  # Area
+            T = section.top_width(y)  # Top width
+            Rh = section.hydraulic_radius(y)  # Hydraulic radius
             g = 9.81  # SI Units
 
             Se = ((nMan * Q) / (A * Rh ** (2 / 3))) ** 2  # Manning eq, slope of EGL
@@ -221,18 +240,65 @@ def solve_ivp():
         st.write(water_surface)
 
     if water_surface.success:
-        st.pyplot(
-            plot_water_profile(
-                x, y, normal_depth.x[0], critical_depth.x[0], bottom_slope
-            )
-        )
+        st.pyplot(plot_water_profile(x, y, y_n, y_c, bottom_slope))
 
     else:
         st.error("Something went wrong...", icon="🧪")
 
+    st.markdown(
+        R"""
+        ****
+        ## 🚧 Stopping before critical depth
+
+        `solve_ivp` integrates over the whole interval, even if the profile gets
+        to critical depth, where $1 - \mathsf{F_r}^2 = 0$ and $dy/dx$ blows up.
+        An *event* function that changes sign as $\mathsf{F_r}^2$ approaches one
+        stops the integration right before the singularity. Without `t_eval`, the
+        solver takes only the steps it needs, and the dense output gives the
+        depth anywhere in between.
+        """
+    )
+
+    with st.echo():
+        from book.channels import integrate_profile
+
+        # This page measures x upstream, the library measures it downstream
+        profile = integrate_profile(
+            section, discharge, n_manning, -bottom_slope, y0, x_span=(0, -2000)
+        )
+
+    if profile.event == "critical":
+        st.warning(
+            f"The profile reaches critical depth {-profile.x[-1]:.0f} m upstream.",
+            icon="🌊",
+        )
+    elif profile.event == "dry":
+        st.warning(
+            f"The depth drops to zero {-profile.x[-1]:.0f} m upstream.",
+            icon="🏜️",
+        )
+    else:
+        st.metric("Adaptive steps", len(profile.x))
+
+    st.markdown(
+        R"""
+        ****
+        ## 🤔 What type of profile is this?
+
+        The slope class follows from comparing $y_n$ with $y_c$ (or from $S_0$ if
+        there is no normal depth), and the zone from where the boundary depth
+        $y(x_0)$ sits with respect to both.
+        """
+    )
+
+    with st.echo():
+        from book.channels import classify_profile
+
+        profile_type = classify_profile(y0, y_n, y_c, S0=-bottom_slope)
+
     _, col, _ = st.columns([1, 1.8, 1])
     with col:
-        st.info("### 🤔 What type of profile is this?")
+        st.info(f"### Profile type: {profile_type}")
 
 
 def plot_water_profile(x, y, y_n, y_c, S0):
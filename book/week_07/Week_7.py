@@ -277,6 +277,7 @@ def page_week_07(option: TOC):
         with cols[0]:
             with st.echo():
                 from scipy.optimize import root
+                from book.channels import TrapezoidalSection
 
                 def optimal_trapz_section_error(
                     y: float,  # Depth [m]
@@ -287,8 +288,9 @@ def page_week_07(option: TOC):
                 ):
                     ## Geometry of a hydraulically optimal section
                     auxm = np.sqrt(1 + m**2)
-                    A = (2 * y * (auxm - m) + m * y) * y
-                    Pw = 2 * y * (2 * auxm - m)
+                    section = TrapezoidalSection(2 * y * (auxm - m), m)
+                    A = section.area(y)
+                    Pw = section.wetted_perimeter(y)
 
                     ## Manning equation
                     Qcalc = 1.0 / n * np.power(A, 5 / 3) / np.power(Pw, 2 / 3) * np.sqrt(S0)
@@ -469,6 +471,7 @@ def page_week_07(option: TOC):
         with cols[0]:
             with st.echo():
                 from scipy.optimize import root
+                from book.channels import TrapezoidalSection
 
                 def unlined_channel_calculate(
                     GEOMETRY: tuple[float],  # [ Depth [m], Base width [m] ]
@@ -488,8 +491,9 @@ def page_week_07(option: TOC):
                     required_wetted_perimeter = required_area / hydr_radius
 
                     ## Actual A and Pw from b and y
-                    calc_area = (b + m * y) * y
-                    calc_wetted_perimeter = b + 2 * y * np.sqrt(1 + m**2)
+                    section = TrapezoidalSection(b, m)
+                    calc_area = section.area(y)
+                    calc_wetted_perimeter = section.wetted_perimeter(y)
 
                     error = [
                         calc_area - required_area,
@@ -2,38 +2,28 @@ import streamlit as st
 import matplotlib.pyplot as plt
 from matplotlib.patches import Circle
 
-from rasterio.enums import Resampling
 import numpy as np
 from statistics import mean
 
-from pysheds.grid import Grid
-import rasterio
-
 from streamlit_folium import st_folium
 import folium
 
 from collections import namedtuple
 
-Point = namedtuple("Point", ["x", "y"])
-
-DIRMAP = (
-    64,
-    128,
-    1,
-    2,
-    4,
-    8,
-    16,
-    32,
-)  # (D8 for mapping) <- This should be a categorical map
+from book.watershed import (
+    STORE_DIR,
+    Delineator,
+    catchment_morphometry,
+    extract_streams,
+    open_store,
+    overview,
+)
 
-TIF_PATH = "./book/assets/dem/clipped.tif"
+Point = namedtuple("Point", ["x", "y"])
 
 
 @st.fragment
 def watershed_delimitation():
-    st.warning("Under maintenance...")
-
     cols = st.columns(2)
 
     with cols[0]:
@@ -50,29 +40,24 @@ def watershed_delimitation():
                 unsafe_allow_html=True,
             )
 
+    ## Precomputed offline with `python -m book.watershed.store`
+    if not (STORE_DIR / "meta.json").exists():
+        st.warning("The flow direction store has not been built yet.")
+        return
+
+    store = open_store(STORE_DIR)
+
     with cols[1]:
-        with rasterio.open(TIF_PATH) as src:
-            bottom, top = src.bounds.bottom, src.bounds.top
-            left, right = src.bounds.left, src.bounds.right
-            width, height = src.width, src.height
-            nodata = src.nodata
-
-            upscale_factor = 0.10
-
-            downscaled_data = src.read(
-                out_shape=(
-                    src.count,
-                    int(src.height * upscale_factor),
-                    int(src.width * upscale_factor),
-                ),
-                resampling=Resampling.bilinear,
-            )
+        st.caption(f"Conditioned DEM, flow directions and accumulation of `{store.meta['source']}`")
+
+    left, bottom, right, top = store.bounds
+    height, width = store.shape
+    nodata = store.nodata
 
-            # # scale image transform
-            # transform = src.transform * src.transform.scale(
-            #     (src.width / downscaled_data.shape[-1]),
-            #     (src.height / downscaled_data.shape[-2]),
-            # )
+    ## Display-size levels of the overview pyramid: drawing them does not
+    ## depend on the size of the raster
+    dem_view = overview(store, "dem")
+    acc_view = overview(store, "acc")
 
     ####################################
     ### Page layout
@@ -90,16 +75,19 @@ def watershed_delimitation():
     st.divider()
     distance_container = st.empty()
 
-    ####################################
-    ### Processing
-    ####################################
-    # grid, dem, fdir, acc = pysheds_workflow(TIF_PATH)
-
     ####################################
     ### Contents // Static
     ####################################
+    ## A click on the map moves the pour point before the inputs are drawn
+    st.session_state.setdefault("pour_point_lat", 33.1032)
+    st.session_state.setdefault("pour_point_lon", -83.7943)
+    if "pour_point_click" in st.session_state:
+        click = st.session_state.pop("pour_point_click")
+        st.session_state.pour_point_lat = min(max(click["lat"], bottom), top)
+        st.session_state.pour_point_lon = min(max(click["lng"], left), right)
+
     with pour_point_container.container(border=True):
-        st.markdown("*Pour point location*")
+        st.markdown("*Pour point location* (or click on the map)")
 
         cols = st.columns(2)
         with cols[0]:
@@ -107,11 +95,10 @@ def watershed_delimitation():
                 "Latitude",
                 bottom,
                 top,
-                33.1032,
-                0.1,
+                step=0.1,
                 format="%.3f",
                 help="Latitude of the pour point for basin delimitation, e.g., 33.805",
-                disabled=True,
+                key="pour_point_lat",
             )
 
         with cols[1]:
@@ -119,11 +106,10 @@ def watershed_delimitation():
                 "Longitude",
                 left,
                 right,
-                -83.7943,
-                0.1,
+                step=0.1,
                 format="%.3f",
                 help="Longitude of the pour point for basin delimitation, e.g., -84.500",
-                disabled=True,
+                key="pour_point_lon",
             )
 
         pour_point = (x, y)
@@ -153,209 +139,189 @@ def watershed_delimitation():
 
         fg.add_child(marker)
 
-        st_folium(
-            m, feature_group_to_add=fg, use_container_width=True, height=500, returned_objects=[]
+        output = st_folium(
+            m,
+            feature_group_to_add=fg,
+            use_container_width=True,
+            height=500,
+            returned_objects=["last_clicked"],
         )
 
-    return
-
-    # with dem_container.container():
-    #     st.subheader("DEM: Digital Elevation Model", divider=True)
-
-    #     tabs = st.tabs(["Heatmap", "Hillshade", "Contours"])
-
-    #     with tabs[0]:
-    #         st.pyplot(plot_map(dem, grid))
-
-    #     with tabs[1]:
-    #         st.pyplot(plot_hillshade(dem, grid))
-
-    #     with tabs[2]:
-    #         st.pyplot(plot_contours(downscaled_data[0], grid))
-
-    #     st.markdown(
-    #         Rf"""
-    #         **🖼️ DEM properties**
-
-    #         *Size:* {width} × {height} px
-
-    #         *Bounds:*
-    #         - W: {left:.2f}° to {right:.2f}°
-    #         - N: {bottom:.2f}° to {top:.2f}°
-
-    #         *No Data:* {nodata}
-    #         """
-    #     )
-
-    #     st.info(
-    #         """
-    #         Also check:
-    #         - USGS topographic maps at [ngmdb.usgs.gov/topoview/](https://ngmdb.usgs.gov/topoview/)
-    #         - Opentopography - High-Resolution Topography Data and Tools at [opentopography.org](https://opentopography.org/)
-    #         """
-    #     )
-
-    # with flow_container.container():
-    #     st.subheader("Flow accumulation", divider="rainbow")
-    #     clipped_catch, branches, dist = pysheds_delineate(pour_point, grid, fdir, acc)
-    #     st.pyplot(plot_accumulation(acc, grid))
-
-    # ####################################
-    # ### Contents // Dynamic
-    # ####################################
-
-    # with network_container.container():
-    #     st.subheader("Flow direction", divider="rainbow")
-
-    #     st.markdown("**D8 algorithm:**")
-
-    #     cols = st.columns(3, vertical_alignment="center")
-
-    #     with cols[0]:
-    #         st.html(
-    #             r"""
-    #             <style type="text/css">
-    #             .tg  {border-collapse:collapse;border-spacing:0;margin:0px auto;}
-    #             .tg td{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
-    #             overflow:hidden;padding:10px 5px;word-break:normal;}
-    #             .tg th{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
-    #             font-weight:normal;overflow:hidden;padding:10px 5px;word-break:normal;}
-    #             .tg .tg-amwm{font-weight:bold;text-align:center;vertical-align:top}
-    #             </style>
-    #             <table class="tg" style="undefined;table-layout: fixed; width: 153px">
-    #             <colgroup>
-    #             <col style="width: 51px">
-    #             <col style="width: 51px">
-    #             <col style="width: 51px">
-    #             </colgroup>
-    #             <tbody>
-    #             <tr>
-    #                 <td class="tg-amwm">NW</td>
-    #                 <td class="tg-amwm">N</td>
-    #                 <td class="tg-amwm">NE</td>
-    #             </tr>
-    #             <tr>
-    #                 <td class="tg-amwm">W</td>
-    #                 <td class="tg-amwm"></td>
-    #                 <td class="tg-amwm">E</td>
-    #             </tr>
-    #             <tr>
-    #                 <td class="tg-amwm">SW</td>
-    #                 <td class="tg-amwm">S</td>
-    #                 <td class="tg-amwm">SE</td>
-    #             </tr>
-    #             </tbody>
-    #             </table>
-    #             """
-    #         )
-
-    #     with cols[1]:
-    #         st.html(
-    #             r"""
-    #             <style type="text/css">
-    #             .tg  {border-collapse:collapse;border-spacing:0;margin:0px auto;}
-    #             .tg td{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
-    #             overflow:hidden;padding:10px 5px;word-break:normal;}
-    #             .tg th{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
-    #             font-weight:normal;overflow:hidden;padding:10px 5px;word-break:normal;}
-    #             .tg .tg-amwm{font-weight:bold;text-align:center;vertical-align:top}
-    #             </style>
-    #             <table class="tg" style="undefined;table-layout: fixed; width: 153px">
-    #             <colgroup>
-    #             <col style="width: 51px">
-    #             <col style="width: 51px">
-    #             <col style="width: 51px">
-    #             </colgroup>
-    #             <tbody>
-    #             <tr>
-    #                 <td class="tg-amwm">32</td>
-    #                 <td class="tg-amwm">64</td>
-    #                 <td class="tg-amwm">128</td>
-    #             </tr>
-    #             <tr>
-    #                 <td class="tg-amwm">16</td>
-    #                 <td class="tg-amwm"></td>
-    #                 <td class="tg-amwm">1</td>
-    #             </tr>
-    #             <tr>
-    #                 <td class="tg-amwm">8</td>
-    #                 <td class="tg-amwm">4</td>
-    #                 <td class="tg-amwm">2</td>
-    #             </tr>
-    #             </tbody>
-    #             </table>
-    #             """,
-    #         )
-
-    #     with cols[2]:
-    #         st.image(
-    #             "https://jeffskwang.github.io/assets/rain/foutput.gif",
-    #             use_container_width=True,
-    #         )
-    #         st.caption("Source: [J. Kwang](https://jeffskwang.github.io/)")
-
-    #     st.pyplot(plot_network(branches, grid, pour_point))
-
-    # with delineated_container.container():
-    #     st.subheader("Delineated catchment", divider="rainbow")
-    #     st.markdown(Rf"Pour point coordinates: {pour_point[1]}° N, {pour_point[0]}° W" "")
-    #     st.pyplot(plot_catchment(clipped_catch, dem, grid, pour_point))
-
-    # with distance_container.container():
-    #     st.subheader("Distance to pour point", divider="rainbow")
-    #     st.pyplot(plot_distance(dist, grid))
+        clicked = (output or {}).get("last_clicked")
+        if clicked and clicked != st.session_state.get("pour_point_last_click"):
+            st.session_state.pour_point_last_click = clicked
+            st.session_state.pour_point_click = clicked
+            st.rerun(scope="fragment")
 
+    with dem_container.container():
+        st.subheader("DEM: Digital Elevation Model", divider=True)
 
-@st.cache_resource
-def pysheds_workflow(file_location: str):
-    # Read elevation raster
-    grid = Grid.from_raster(file_location)
-    dem = grid.read_raster(file_location)
+        tabs = st.tabs(["Heatmap", "Hillshade", "Contours"])
 
-    # Fill pits and depressions in DEM
-    pit_filled_dem = grid.fill_pits(dem)
-    flooded_dem = grid.fill_depressions(pit_filled_dem)
+        with tabs[0]:
+            st.pyplot(plot_map(dem_view))
 
-    # Resolve flats in DEM
-    inflated_dem = grid.resolve_flats(flooded_dem)
+        with tabs[1]:
+            st.pyplot(plot_hillshade(dem_view))
 
-    # Compute flow directions
-    fdir = grid.flowdir(inflated_dem, dirmap=DIRMAP)
+        with tabs[2]:
+            st.pyplot(plot_contours(dem_view))
 
-    # Calculate flow accumulation
-    acc = grid.accumulation(fdir, dirmap=DIRMAP)
+        st.markdown(
+            Rf"""
+            **🖼️ DEM properties**
 
-    return grid, dem, fdir, acc
+            *Size:* {width} × {height} px
 
+            *Bounds:*
+            - W: {left:.2f}° to {right:.2f}°
+            - N: {bottom:.2f}° to {top:.2f}°
 
-@st.cache_resource
-def pysheds_delineate(pour_point: tuple[float], _grid, _fdir, _acc):
-    # Snap pour point to high accumulation cell
-    x_snap, y_snap = _grid.snap_to_mask(_acc > 1000, pour_point)
+            *No Data:* {nodata}
+            """
+        )
 
-    # Delineate the catchment
-    catch = _grid.catchment(x=x_snap, y=y_snap, fdir=_fdir, dirmap=DIRMAP, xytype="coordinate")
+        st.info(
+            """
+            Also check:
+            - USGS topographic maps at [ngmdb.usgs.gov/topoview/](https://ngmdb.usgs.gov/topoview/)
+            - Opentopography - High-Resolution Topography Data and Tools at [opentopography.org](https://opentopography.org/)
+            """
+        )
 
-    # Clip the bounding box to the catchment
-    # grid.clip_to(catch)
-    clipped_catch = _grid.view(catch)
+    with flow_container.container():
+        st.subheader("Flow accumulation", divider="rainbow")
+        catchment = delineator(str(store.path)).catchment(*pour_point, threshold=1000)
+        network = river_network(str(store.path), threshold=1000)
+        st.pyplot(plot_accumulation(acc_view))
 
-    # Extract river network
-    branches = _grid.extract_river_network(_fdir, _acc > 1000, dirmap=DIRMAP)
+    ####################################
+    ### Contents // Dynamic
+    ####################################
 
-    # Calculate distance to outlet from each cell
-    dist = _grid.distance_to_outlet(
-        x=x_snap, y=y_snap, fdir=_fdir, dirmap=DIRMAP, xytype="coordinate"
-    )
+    with network_container.container():
+        st.subheader("Flow direction", divider="rainbow")
+
+        st.markdown("**D8 algorithm:**")
+
+        cols = st.columns(3, vertical_alignment="center")
 
-    return clipped_catch, branches, dist
+        with cols[0]:
+            st.html(
+                r"""
+                <style type="text/css">
+                .tg  {border-collapse:collapse;border-spacing:0;margin:0px auto;}
+                .tg td{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
+                overflow:hidden;padding:10px 5px;word-break:normal;}
+                .tg th{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
+                font-weight:normal;overflow:hidden;padding:10px 5px;word-break:normal;}
+                .tg .tg-amwm{font-weight:bold;text-align:center;vertical-align:top}
+                </style>
+                <table class="tg" style="undefined;table-layout: fixed; width: 153px">
+                <colgroup>
+                <col style="width: 51px">
+                <col style="width: 51px">
+                <col style="width: 51px">
+                </colgroup>
+                <tbody>
+                <tr>
+                    <td class="tg-amwm">NW</td>
+                    <td class="tg-amwm">N</td>
+                    <td class="tg-amwm">NE</td>
+                </tr>
+                <tr>
+                    <td class="tg-amwm">W</td>
+                    <td class="tg-amwm"></td>
+                    <td class="tg-amwm">E</td>
+                </tr>
+                <tr>
+                    <td class="tg-amwm">SW</td>
+                    <td class="tg-amwm">S</td>
+                    <td class="tg-amwm">SE</td>
+                </tr>
+                </tbody>
+                </table>
+                """
+            )
+
+        with cols[1]:
+            st.html(
+                r"""
+                <style type="text/css">
+                .tg  {border-collapse:collapse;border-spacing:0;margin:0px auto;}
+                .tg td{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
+                overflow:hidden;padding:10px 5px;word-break:normal;}
+                .tg th{border-color:black;border-style:solid;border-width:1px;font-family:Arial, sans-serif;font-size:14px;
+                font-weight:normal;overflow:hidden;padding:10px 5px;word-break:normal;}
+                .tg .tg-amwm{font-weight:bold;text-align:center;vertical-align:top}
+                </style>
+                <table class="tg" style="undefined;table-layout: fixed; width: 153px">
+                <colgroup>
+                <col style="width: 51px">
+                <col style="width: 51px">
+                <col style="width: 51px">
+                </colgroup>
+                <tbody>
+                <tr>
+                    <td class="tg-amwm">32</td>
+                    <td class="tg-amwm">64</td>
+                    <td class="tg-amwm">128</td>
+                </tr>
+                <tr>
+                    <td class="tg-amwm">16</td>
+                    <td class="tg-amwm"></td>
+                    <td class="tg-amwm">1</td>
+                </tr>
+                <tr>
+                    <td class="tg-amwm">8</td>
+                    <td class="tg-amwm">4</td>
+                    <td class="tg-amwm">2</td>
+                </tr>
+                </tbody>
+                </table>
+                """,
+            )
+
+        with cols[2]:
+            st.image(
+                "https://jeffskwang.github.io/assets/rain/foutput.gif",
+                use_container_width=True,
+            )
+            st.caption("Source: [J. Kwang](https://jeffskwang.github.io/)")
+
+        st.pyplot(plot_network(network, store.bounds, pour_point))
+
+    with delineated_container.container():
+        st.subheader("Delineated catchment", divider="rainbow")
+        st.markdown(Rf"Pour point coordinates: {pour_point[1]}° N, {pour_point[0]}° W" "")
+        st.pyplot(plot_catchment(catchment, store.dem, pour_point))
+
+        ## Inputs for the Rational and SCS methods (see Week 9)
+        morphometry = catchment_morphometry(delineator(str(store.path)), [catchment.outlet])
+        st.dataframe(morphometry.to_frame().T.rename(columns=lambda _: "Catchment"))
+
+    with distance_container.container():
+        st.subheader("Distance to pour point", divider="rainbow")
+        st.pyplot(plot_distance(catchment, pour_point))
+
+
+@st.cache_resource
+def delineator(store_path: str):
+    ## Upstream search over the inverse D8 graph: only the catchment cells are visited
+    return Delineator(open_store(store_path))
+
+
+@st.cache_resource
+def river_network(store_path: str, threshold: float = 1000):
+    ## Does not depend on the pour point, so it is extracted once
+    return extract_streams(open_store(store_path), threshold)
 
 
 @st.cache_data
-def plot_map(_dem, _grid):
+def plot_map(_view):
     fig, ax = plt.subplots(figsize=(8, 6))
 
-    img = ax.imshow(_dem, extent=_grid.extent, cmap="terrain", zorder=1)
+    img = ax.imshow(_view.data, extent=_view.extent, cmap="terrain", zorder=1)
     fig.colorbar(img, label="Elevation (m)", shrink=0.5)
     ax.grid(zorder=0)
     ax.set_title("Digital elevation map (Heatmap)", size=14)
@@ -367,15 +333,15 @@ def plot_map(_dem, _grid):
 
 
 @st.cache_data
-def plot_hillshade(_dem, _grid):
+def plot_hillshade(_view):
     from matplotlib.colors import LightSource
 
     ls = LightSource(azdeg=315, altdeg=45)
 
     fig, ax = plt.subplots(figsize=(8, 6))
     ax.imshow(
-        ls.hillshade(_dem, vert_exag=0.5, dx=1.0, dy=1.0),
-        extent=_grid.extent,
+        ls.hillshade(np.asarray(_view.data), vert_exag=0.5, dx=1.0, dy=1.0),
+        extent=_view.extent,
         cmap="gray",
     )
 
@@ -389,12 +355,12 @@ def plot_hillshade(_dem, _grid):
 
 
 @st.cache_data
-def plot_contours(_dem, _grid):
+def plot_contours(_view):
     fig, ax = plt.subplots(figsize=(8, 6))
 
     csf = ax.contourf(
-        np.flipud(_dem),
-        extent=_grid.extent,
+        np.flipud(_view.data),
+        extent=_view.extent,
         levels=np.arange(50, 400, 50),
         cmap="Greens_r",
     )
@@ -402,8 +368,8 @@ def plot_contours(_dem, _grid):
     fig.colorbar(csf, label="Elevation (m)", shrink=0.5)
 
     cs = ax.contour(
-        np.flipud(_dem),
-        extent=_grid.extent,
+        np.flipud(_view.data),
+        extent=_view.extent,
         levels=np.arange(100, 550, 50),
         colors="k",
         linewidths=1,
@@ -423,16 +389,16 @@ def plot_contours(_dem, _grid):
 
 
 @st.cache_data
-def plot_accumulation(_acc, _grid):
+def plot_accumulation(_view):
     from matplotlib.colors import LogNorm
 
     fig, ax = plt.subplots(figsize=(8, 6))
     img = ax.imshow(
-        _acc,
-        extent=_grid.extent,
+        _view.data,
+        extent=_view.extent,
         zorder=2,
         cmap="cubehelix",
-        norm=LogNorm(1, _acc.max()),
+        norm=LogNorm(1, _view.data.max()),
         interpolation="bilinear",
     )
     fig.colorbar(img, ax=ax, label="Upstream Cells", shrink=0.5)
@@ -446,18 +412,21 @@ def plot_accumulation(_acc, _grid):
 
 
 @st.cache_data
-def plot_catchment(_clip, _dem, _grid, pour_point):
+def plot_catchment(_catchment, _dem, pour_point):
     fig, ax = plt.subplots(figsize=(8, 6))
+    rows, cols = _catchment.window
 
     img = ax.imshow(
-        np.where(_clip, _clip, np.nan),
+        np.where(_catchment.mask(), 1.0, np.nan),
         zorder=2,
         alpha=0.2,
         cmap="Greys_r",
-        extent=_grid.extent,
+        extent=_catchment.extent,
     )
 
-    img = ax.imshow(_dem, alpha=0.95, cmap="terrain", zorder=0, extent=_grid.extent)
+    img = ax.imshow(
+        _dem[rows, cols], alpha=0.95, cmap="terrain", zorder=0, extent=_catchment.extent
+    )
     fig.colorbar(img, ax=ax, label="Elevation (m)", shrink=0.5)
 
     ax.add_artist(Circle(pour_point, 0.02, fc="purple", zorder=4))
@@ -465,25 +434,24 @@ def plot_catchment(_clip, _dem, _grid, pour_point):
     ax.grid("on", zorder=0)
     ax.set_xlabel("Longitude")
     ax.set_ylabel("Latitude")
-    ax.set_title("Delineated Catchment", size=14)
+    ax.set_title(f"Delineated Catchment ({len(_catchment):,} cells)", size=14)
     ax.set_aspect("equal")
     return fig
 
 
 @st.cache_data
-def plot_network(_branches, _grid, pour_point):
+def plot_network(_network, _bounds, pour_point):
     fig, ax = plt.subplots(figsize=(8, 6))
 
-    for branch in _branches["features"]:
-        line = np.asarray(branch["geometry"]["coordinates"])
-        plt.plot(line[:, 0], line[:, 1], c="k", lw=0.2)
+    ## A single artist for the whole network, wider lines for higher Strahler orders
+    ax.add_collection(_network.line_collection(colors="k", zorder=2))
 
     ax.add_artist(Circle(pour_point, 0.02, fc="purple", zorder=4))
 
     ax.grid(True, zorder=0)
-    ax.set_xlim(_grid.bbox[0], _grid.bbox[2])
-    ax.set_ylim(_grid.bbox[1], _grid.bbox[3])
-    ax.set_title("D8 channels", size=14)
+    ax.set_xlim(_bounds[0], _bounds[2])
+    ax.set_ylim(_bounds[1], _bounds[3])
+    ax.set_title(f"D8 channels (Strahler order up to {_network.order.max(initial=0)})", size=14)
     ax.set_xlabel("Longitude")
     ax.set_ylabel("Latitude")
     ax.set_aspect("equal")
@@ -491,9 +459,11 @@ def plot_network(_branches, _grid, pour_point):
 
 
 @st.cache_data
-def plot_distance(dist, _grid):
+def plot_distance(_catchment, pour_point):
     fig, ax = plt.subplots(figsize=(8, 6))
-    img = ax.imshow(dist, extent=_grid.extent, zorder=2, cmap="cubehelix_r")
+    img = ax.imshow(
+        _catchment.distance_grid(), extent=_catchment.extent, zorder=2, cmap="cubehelix_r"
+    )
     fig.colorbar(img, ax=ax, label="Distance to outlet (cells)", shrink=0.5)
     ax.grid(True, zorder=0)
     ax.set_xlabel("Longitude")
@@ -6,6 +6,8 @@ import matplotlib as mpl
 from urllib.parse import urlparse
 from typing import Literal
 
+from book.hydrology import scs_runoff
+
 from .subpages import rating_curve
 
 
@@ -655,16 +657,10 @@ def plot_curve_number():
 
     ax.set_prop_cycle(plt.cycler("color", plt.cm.cividis(np.linspace(0, 1, len(curve_numbers)))))
 
-    for cn in curve_numbers:
-        storage_deficit = 1000.0 / cn - 10
-        initial_abstraction = 0.2 * storage_deficit
-        runoff = np.where(
-            rainfall >= initial_abstraction,
-            np.power(rainfall - initial_abstraction, 2)
-            / (rainfall - initial_abstraction + storage_deficit),
-            0,
-        )
-        ax.plot(rainfall, runoff, label=f"{cn}", lw=2)
+    runoff = scs_runoff(rainfall[:, None], curve_numbers)
+
+    for cn, curve in zip(curve_numbers, runoff.T):
+        ax.plot(rainfall, curve, label=f"{cn}", lw=2)
 
     ax.legend(title="Curve Number", loc="center left", bbox_to_anchor=(1.0, 0.5))
 
@@ -10,6 +10,10 @@ from datetime import date
 import pandas as pd
 from scipy.optimize import curve_fit
 
+from book.hydrology import fit_segmented_rating, RatingTable, apply_rating
+from book.hydrology.rating import exponential_rating, exponential_rating_jac
+from book.hydrology.bootstrap import bootstrap_rating, rating_bands, jackknife_stderr
+
 
 def rating_curve():
     img_url = "./book/assets/img/RatingCurve_02215500.png"
@@ -232,6 +236,105 @@ def rating_curve():
     pd_perr = pd.DataFrame(perr, index=[*"abc"])
     st.table(pd_perr.style.format("{:.3E}"))
 
+    st.subheader("Resampling the field measurements")
+    st.markdown(
+        R"""
+        The covariance matrix assumes the errors are normal and the model is
+        nearly linear around the optimum. Another option is to refit the curve
+        many times on **resampled** field measurements and look at the spread
+        of the fitted curves.
+
+        - **Bootstrap:** draw $n$ measurements with replacement, many times
+        - **Jackknife:** leave one measurement out at a time
+        """
+    )
+
+    cols = st.columns(2)
+    with cols[0]:
+        resampling = st.radio("Resampling", ["bootstrap", "jackknife"], horizontal=True)
+    with cols[1]:
+        n_resamples = st.select_slider(
+            "Number of resamples",
+            [500, 1_000, 2_000, 5_000, 10_000],
+            2_000,
+            disabled=(resampling == "jackknife"),
+        )
+
+    with st.echo():
+        resampled = bootstrap_rating(
+            exponential_rating,
+            exponential_rating_jac,
+            y_field,
+            Q_field,
+            p0=popt,
+            n_resamples=n_resamples,
+            method=resampling,
+        )
+
+    residuals = Q_field - my_power_law(y_field, *popt)
+    conf_lower, _, conf_upper = rating_bands(
+        exponential_rating, resampled.params, y_calc, method=resampling
+    )
+    pred_lower, _, pred_upper = rating_bands(
+        exponential_rating, resampled.params, y_calc, residuals=residuals, method=resampling
+    )
+
+    cols = st.columns(3)
+    with cols[0]:
+        st.metric("Fits", f"{len(resampled.params):,}")
+    with cols[1]:
+        st.metric("Elapsed time", f"{resampled.elapsed:.2f} s")
+    with cols[2]:
+        st.metric("Throughput", f"{resampled.throughput:,.0f} fits/s")
+
+    if resampling == "jackknife":
+        resampled_err = jackknife_stderr(resampled.params)
+    else:
+        resampled_err = np.nanstd(resampled.params, axis=0)
+
+    pd_resampled_err = pd.DataFrame({"covariance": perr, resampling: resampled_err}, index=[*"abc"])
+    st.table(pd_resampled_err.style.format("{:.3E}"))
+
+    fig, ax = plt.subplots()
+    ax.grid(True, which="both", axis="both", zorder=1)
+    ax.fill_betweenx(
+        y_calc,
+        pred_lower,
+        pred_upper,
+        color="cornflowerblue",
+        alpha=0.2,
+        label="95% prediction band",
+        zorder=2,
+    )
+    ax.fill_betweenx(
+        y_calc,
+        conf_lower,
+        conf_upper,
+        color="cornflowerblue",
+        alpha=0.5,
+        label="95% confidence band",
+        zorder=3,
+    )
+    ax.plot(Q_calc, y_calc, lw=2, c="cornflowerblue", label="Fitted curve", zorder=4)
+    ax.scatter(Q_field, y_field, label="Field measurements", c="k", marker="x", zorder=5)
+
+    ax.set_xlabel("Discharge (ft³/s)")
+    ax.set_ylim(-5, 30)
+    ax.set_ylabel("Gage height (ft)")
+    ax.yaxis.set_minor_locator(MultipleLocator(1))
+    ax.set_title("OCMULGEE RIVER AT LUMBER CITY, GA")
+    ax.legend()
+
+    tabs = st.tabs(["linear", "semilog"])
+    with tabs[0]:
+        ax.set_xlim(600, 110_000)
+        st.pyplot(fig)
+
+    with tabs[1]:
+        ax.set_xlim(600, 200_000)
+        ax.set_xscale("log")
+        st.pyplot(fig)
+
     st.subheader("Coefficient of determination")
     st.markdown("How far are the predictions from the observations?")
     st.latex(R"R^2 = 1 - \dfrac{\sum_i{(y_i - f_i)^2}}{\sum_i{(y_i - \bar{y})^2}}")
@@ -256,6 +359,120 @@ def rating_curve():
 
     st.metric("$R^2$", f"{R2:.3}")
 
+    st.divider()
+    st.header("Segmented power-law rating")
+    st.markdown(
+        R"""
+        USGS ratings are not a single equation. They are built from offset power laws,
+        each valid over a range of stage, joined at **breakpoints**:
+        """
+    )
+    st.latex(R"Q = C_k \, (H - e_k)^{\beta_k} \quad \textsf{for} \quad H_{k-1} \leq H < H_k")
+    st.markdown(
+        R"""
+        | Parameter | Symbol   | Units  |
+        |:---------|:--------:|:------------------:|
+        |Gage height | $H$   | ft |
+        |Gage height of zero flow | $e_k$ | ft |
+        |Coefficient | $C_k$ | ft³/s/ft$^{\beta_k}$ |
+        |Exponent | $\beta_k$ | - |
+
+        &nbsp;
+        """
+    )
+
+    n_segments = st.radio("Number of segments", [1, 2, 3], index=1, horizontal=True)
+
+    with st.echo():
+        rating, sse = fit_segmented_rating(y_field, Q_field, n_segments=n_segments)
+
+    st.dataframe(rating.to_frame().style.format("{:.3f}"), use_container_width=True)
+
+    Q_seg = rating(y_calc)
+
+    fig, ax = plt.subplots()
+    ax.grid(True, which="both", axis="both", zorder=1)
+    ax.plot(Q, y, c="gray", lw=2, label="USGS Rating curve", zorder=2)
+    ax.plot(Q_seg, y_calc, lw=2, c="purple", label="Segmented rating", zorder=4)
+    ax.scatter(Q_field, y_field, label="Field measurements", c="k", marker="x", zorder=5)
+
+    for H_break in rating.breaks:
+        ax.axhline(H_break, c="purple", ls="dotted", lw=1, zorder=3)
+
+    ax.set_xlabel("Discharge (ft³/s)")
+    ax.set_ylim(-5, 30)
+    ax.set_ylabel("Gage height (ft)")
+    ax.yaxis.set_minor_locator(MultipleLocator(1))
+    ax.set_title("OCMULGEE RIVER AT LUMBER CITY, GA")
+    ax.legend()
+
+    tabs = st.tabs(["linear", "semilog"])
+    with tabs[0]:
+        ax.set_xlim(600, 110_000)
+        st.pyplot(fig)
+
+    with tabs[1]:
+        ax.set_xlim(600, 200_000)
+        ax.set_xscale("log")
+        st.pyplot(fig)
+
+    Q_field_seg = rating(y_field)
+    R2_seg = 1.0 - np.sum(np.power(Q_field - Q_field_seg, 2)) / np.sum(variance)
+    st.metric("$R^2$", f"{R2_seg:.3}")
+
+    st.divider()
+    st.header("From stage to discharge")
+    st.markdown(
+        R"""
+        The gage only records the water level. The discharge series is obtained by
+        passing the instantaneous stage through the rating. The USGS `exsa` table is
+        already shift-adjusted, so it can be interpolated directly.
+        """
+    )
+
+    iv_start, iv_end = st.date_input(
+        "Stage record",
+        [date(2023, 4, 1), date(2023, 5, 1)],
+        date(2007, 10, 1),
+        date(2023, 5, 21),
+    )
+
+    with st.echo():
+        stage_query = nwis.get_iv(
+            sites=site_id,
+            start=iv_start.isoformat(),
+            end=iv_end.isoformat(),
+            parameterCd="00065",
+        )
+        stage = stage_query[0]["00065"]
+
+        usgs_rating = RatingTable.from_exsa(data)
+        Q_usgs = apply_rating(stage, usgs_rating)
+        Q_fitted = apply_rating(stage, rating)
+
+    fig, axs = plt.subplots(2, 1, sharex=True, figsize=(8, 6))
+    axs[0].plot(stage.index, stage, c="k", lw=1)
+    axs[0].set_ylabel("Gage height (ft)")
+    axs[1].plot(Q_usgs.index, Q_usgs, c="gray", lw=2, label="USGS Rating curve")
+    axs[1].plot(Q_fitted.index, Q_fitted, c="purple", lw=1, label="Segmented rating")
+    axs[1].set_ylabel("Discharge (ft³/s)")
+    axs[1].legend()
+
+    for ax in axs:
+        ax.grid(True)
+
+    axs[0].set_title("OCMULGEE RIVER AT LUMBER CITY, GA")
+    fig.autofmt_xdate()
+    st.pyplot(fig)
+
+    st.info(
+        R"""
+        For decades of 15-minute data, `book.hydrology.convert_stage_record` streams a
+        CSV or Parquet stage record through the rating in chunks and writes the
+        discharge series without loading the whole record in memory.
+        """
+    )
+
 
 if __name__ == "__main__":
     rating_curve()
@@ -7,6 +7,10 @@ from dataretrieval import nwis
 from datetime import timedelta
 from typing import Literal
 
+from book.hydrology import DISTRIBUTIONS
+from book.hydrology.risk import design_return_period
+from book.hydrology.frequency import weibull_plotting_position
+
 
 TOC = Literal[
     "Expected value",
@@ -227,6 +231,36 @@ def page_week_10(option: TOC):
             of each other. 
             """)
 
+        st.divider()
+        st.markdown(R"""
+            ## Which distribution fits best?
+
+            Consider again the annual peaks of USGS 03339000 VERMILION RIVER NEAR DANVILLE, IL.
+            All candidate distributions are tested at once using $k$ **equal-probability
+            classes**, so every class expects the same number of observations
+            $E_i = n/k$. Two other statistics compare the whole empirical CDF against
+            the fitted one:
+
+            - **Kolmogorov-Smirnov:** $D = \max{\left| F_n(x) - F(x) \right|}$
+            - **Anderson-Darling:** $A^2$, which puts more weight on the tails
+            """)
+
+        with st.echo():
+            from book.hydrology.goodness_of_fit import goodness_of_fit, to_frame
+
+            peaks, _ = nwis.get_discharge_peaks("03339000")
+            fit_test = goodness_of_fit(peaks)
+
+        table = to_frame(fit_test)
+        table["χ²_α"] = chi2.ppf(1.0 - signif_alpha, table["df"])
+        table["Accepted?"] = table["χ²"] < table["χ²_α"]
+
+        st.dataframe(table.style.format(precision=3), use_container_width=True)
+        st.caption(
+            f"{fit_test.n[0]} peaks in {fit_test.n_classes} classes, "
+            f"α = {signif_alpha}, ranked by the Anderson-Darling statistic"
+        )
+
     elif option == "Return period":
         st.markdown(R"""
             ## Recurrence interval
@@ -312,6 +346,79 @@ def page_week_10(option: TOC):
         ax.set_title("USGS 03339000 VERMILION RIVER NEAR DANVILLE, IL")
         st.pyplot(fig)
 
+        st.divider()
+        st.markdown(R"""
+            ## Flood frequency analysis
+
+            Instead of counting exceedances, fit a probability distribution to the annual
+            peaks and read the discharge for any return period:
+
+            $$
+                x_T = F^{-1}\left(1 - \dfrac{1}{T}\right)
+            $$
+
+            - **Method of moments:** match the sample mean, standard deviation and skew
+            - **L-moments:** match linear combinations of the ordered sample, less
+            sensitive to the largest peaks in short records
+            """)
+
+        cols = st.columns(2)
+        with cols[0]:
+            fit_method = st.radio(
+                "Fitting method",
+                ["moments", "lmoments"],
+                format_func=lambda x: {"moments": "Moments", "lmoments": "L-moments"}[x],
+                horizontal=True,
+            )
+        with cols[1]:
+            regional_skew = st.number_input(
+                "Regional skew (Log-Pearson III)",
+                -1.0,
+                1.0,
+                None,
+                0.05,
+                help="Weighted with the station skew, as in Bulletin 17C. Leave empty to use only the station skew.",
+            )
+
+        with st.echo():
+            from book.hydrology import FloodFrequency
+
+            frequency = FloodFrequency(peaks, method=fit_method, regional_skew=regional_skew)
+            return_periods = [2, 5, 10, 25, 50, 100, 200, 500]
+            quantiles = frequency.to_frame(return_periods)
+
+        st.dataframe(quantiles.style.format("{:,.0f}"), use_container_width=True)
+
+        st.markdown("**Return period of 20000 ft³/s:**")
+        cols = st.columns(len(DISTRIBUTIONS))
+        for col, distribution in zip(cols, DISTRIBUTIONS):
+            with col:
+                T_20k = frequency.return_period(20_000, distribution)[0, 0]
+                st.metric(distribution, f"{T_20k:.1f} years")
+
+        empirical_peaks, empirical_T = weibull_plotting_position(peaks["peak_va"])
+        T_curve = np.geomspace(1.01, 500, 200)
+
+        fig, ax = plt.subplots()
+        ax.scatter(
+            empirical_T,
+            empirical_peaks,
+            c="k",
+            marker="x",
+            label="Weibull plotting position",
+            zorder=4,
+        )
+        for distribution, Q_T in frequency.quantiles(T_curve).items():
+            ax.plot(T_curve, Q_T[0], lw=2, label=distribution)
+
+        ax.set_xscale("log")
+        ax.set_xlabel("Return period $T$ [years]")
+        ax.set_ylabel("Peak instantaneous discharge [ft³/s]")
+        ax.set_title("USGS 03339000 VERMILION RIVER NEAR DANVILLE, IL")
+        ax.grid(which="both", visible=True, lw=1, alpha=0.2, c="k")
+        ax.legend()
+        st.pyplot(fig)
+
     else:
         st.markdown(R"""
             ## Estimated Limiting Value (ELV)
@@ -340,26 +447,31 @@ def page_week_10(option: TOC):
             
             """)
 
-        risk_value = st.number_input(r"$\bar{R}$", 0.0, 1.0, 0.60, 0.05, format="%.2f")
+        ## A risk of zero would need an infinite return period
+        risk_value = st.number_input(r"$\bar{R}$", 0.01, 1.0, 0.60, 0.05, format="%.2f")
 
         design_life = np.geomspace(1, 1000, 50)
         return_period = np.geomspace(1, 1000, 50)
         nn, tt = np.meshgrid(design_life, return_period)
         risk = 1.0 - np.power(1.0 - 1.0 / tt, nn)
         fig, ax = plt.subplots()
-        # levels = np.arange(0.05, 1.00, 0.10)
-        levels = [risk_value]
-        cs = ax.contour(nn, tt, risk, levels=levels, colors="k")  # , label=r"$\bar{R}$")
         img = ax.pcolormesh(nn, tt, risk, vmin=0.00, vmax=1.00, alpha=0.5, cmap="jet")
         plt.colorbar(img, label=r"$\bar{R}$", shrink=0.5)
-        ax.clabel(
-            cs,
-            levels=levels,
-            inline=False,
-            colors="w",
+
+        ## Exact curve T(n) for the selected risk, from the closed-form inverse
+        design_life_curve = np.geomspace(1, 1000, 5000)
+        return_period_curve = design_return_period(risk_value, design_life_curve)
+        ax.plot(design_life_curve, return_period_curve, c="k", lw=2)
+        ax.text(
+            design_life_curve[2500],
+            return_period_curve[2500],
+            Rf"$\bar{{R}}$ = {risk_value:.2f}",
+            color="w",
             fontsize=16,
-            fmt="$\\bar{R}$ = %.2f",
+            ha="right",
+            va="bottom",
         )
+        ax.set_ylim(1, 1000)
         ax.set_xscale("log")
         ax.set_yscale("log")
         ax.grid(which="both", visible=True, lw=1, alpha=0.2, c="k")
@@ -384,6 +496,98 @@ def page_week_10(option: TOC):
             """
         )
 
+        st.markdown(R"""
+            Solving for $T$ gives a closed form:
+
+            $$
+                T = \dfrac{1}{1 - \left( 1 - \bar{R} \right)^{1/n}}
+            $$
+            """)
+
+        cols = st.columns(3)
+        with cols[0]:
+            example_risk = st.number_input(
+                r"Acceptable risk $\bar{R}$", 0.01, 0.99, 0.10, 0.01, format="%.2f"
+            )
+        with cols[1]:
+            example_life = st.number_input("Expected life $n$ [years]", 1, 1000, 10, 1)
+        with cols[2]:
+            st.metric(
+                "Design return period $T$",
+                f"{design_return_period(example_risk, example_life):.1f} years",
+            )
+
+        st.markdown(R"""
+            ## Simulating the risk
+
+            The same risk can be estimated by brute force: draw many synthetic series of
+            annual maxima, split them into design lives of $n$ years, and count the
+            fraction of lives in which the $T$-year event was exceeded at least once.
+            """)
+
+        cols = st.columns(3)
+        with cols[0]:
+            simulated_years = st.select_slider(
+                "Simulated years",
+                [10**4, 10**5, 10**6, 10**7, 10**8],
+                10**6,
+                format_func=lambda x: f"10^{np.log10(x):.0f}",
+            )
+        with cols[1]:
+            mc_design_life = st.number_input("Design life $n$ [years]", 1, 200, 10, 1)
+        with cols[2]:
+            target_risk = st.number_input(
+                r"Target risk $\bar{R}$", 0.01, 0.99, 0.10, 0.01, format="%.2f"
+            )
+
+        with st.echo():
+            from book.hydrology.risk import simulate_risk
+
+            simulation = simulate_risk(
+                design_lives=[mc_design_life],
+                return_periods=np.geomspace(1.01, 1000, 200),
+                n_years=simulated_years,
+            )
+            T_design = simulation.design_return_period(target_risk)[0]
+
+        lower, upper = simulation.confidence_interval(0.95)[:, 0]
+
+        fig, ax = plt.subplots()
+        ax.fill_between(
+            simulation.return_periods,
+            lower,
+            upper,
+            color="purple",
+            alpha=0.3,
+            label="95% confidence interval",
+        )
+        ax.plot(
+            simulation.return_periods,
+            simulation.risk[0],
+            c="purple",
+            lw=1,
+            label=f"Simulated ({simulation.n_lives[0]:,} lives)",
+        )
+        ax.plot(
+            simulation.return_periods,
+            1.0 - np.power(1.0 - 1.0 / simulation.return_periods, mc_design_life),
+            c="k",
+            ls="dashed",
+            lw=1,
+            label=r"$1 - (1 - 1/T)^n$",
+        )
+        ax.axhline(target_risk, c="gray", lw=1)
+        ax.axvline(T_design, c="gray", lw=1)
+        ax.set_xscale("log")
+        ax.set_xlabel(r"Return period $T$ [years]")
+        ax.set_ylabel(r"Hydrological risk $\bar{R}$")
+        ax.set_title(Rf"Design life $n$ = {mc_design_life} years")
+        ax.grid(which="both", visible=True, lw=1, alpha=0.2, c="k")
+        ax.legend()
+        st.pyplot(fig)
+
+        st.metric(Rf"Simulated $T$ for $\bar{{R}}$ = {target_risk:.2f}", f"{T_design:.1f} years")
+
         st.markdown(R"""
             ## Safety factor and safety margin
 
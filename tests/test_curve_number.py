@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from book.hydrology.curve_number import adjust_arc, gridded_runoff, scs_runoff
+
+
+def _conditions():
+    cn = np.full((40, 50), 75.0, dtype=np.float32)
+    arc = np.full(cn.shape, 2, dtype=np.uint8)
+    arc[:20] = 1
+    arc[20:, :25] = 3
+    return cn, arc
+
+
+def _check(runoff, cn, arc, rain):
+    np.testing.assert_allclose(runoff, scs_runoff(rain, adjust_arc(cn, arc)), rtol=1e-6)
+    average = scs_runoff(rain, 75.0)
+    assert np.all(runoff[arc == 1] < average) and np.all(runoff[arc == 3] > average)
+
+
+def test_arc_array_changes_runoff():
+    cn, arc = _conditions()
+    _check(gridded_runoff(cn, 3.0, arc=arc, tile=16), cn, arc, 3.0)
+
+
+def test_arc_raster_changes_runoff():
+    pytest.importorskip("rasterio")
+    from rasterio.io import MemoryFile
+
+    cn, arc = _conditions()
+    profile = dict(driver="GTiff", height=arc.shape[0], width=arc.shape[1], count=1)
+    with MemoryFile() as memfile:
+        with memfile.open(dtype=arc.dtype, **profile) as dataset:
+            dataset.write(arc, 1)
+        with memfile.open() as dataset:
+            _check(gridded_runoff(cn, 3.0, arc=dataset, tile=16), cn, arc, 3.0)
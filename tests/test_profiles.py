@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from book.channels import RectangularSection
+from book.channels.depths import critical_depth
+from book.channels.gvf import specific_force
+from book.channels.profiles import locate_jump, profile_family
+
+
+@pytest.mark.parametrize("S0, kind", [(0.0, "H2"), (-0.001, "A2")])
+def test_subcritical_profiles_rise_upstream_without_normal_depth(S0, kind):
+    family = profile_family(RectangularSection(3.0), [10.0, 20.0], 0.03, S0, 2.0, length=500.0)
+
+    assert np.all(family.types == kind)
+    assert np.all(np.isfinite(family.depth))
+    assert np.all(np.diff(family.depth, axis=1) > 0)  # Stations run upstream of the control
+    assert np.all(family.depth > family.y_c[:, None])
+
+
+@pytest.mark.parametrize("S0", [0.0, -0.001])
+def test_jump_on_horizontal_and_adverse_channels(S0):
+    channel = RectangularSection(3.0)
+    jump = locate_jump(channel, 10.0, 0.015, S0, 0.3, 2.0, length=200.0)
+
+    assert jump.location[0] == "reach"
+    assert 0 < jump.x[0] < 200.0
+    assert jump.y1[0] < critical_depth(channel, 10.0) < jump.y2[0]
+    np.testing.assert_allclose(
+        specific_force(channel, 10.0, jump.y1), specific_force(channel, 10.0, jump.y2), rtol=1e-2
+    )
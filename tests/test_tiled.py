@@ -0,0 +1,29 @@
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+from book.watershed.tiled import tiled_accumulation, tiled_fill, tiled_flow_direction
+
+
+def _layers(dem, tile, scratch):
+    filled = np.empty(dem.shape, dtype=np.float32)
+    tiled_fill(dem, filled, tile, scratch_dir=scratch)
+    fdir = np.empty(dem.shape, dtype=np.uint8)
+    tiled_flow_direction(filled, fdir, tile)
+    acc = np.empty(dem.shape)
+    tiled_accumulation(fdir, acc, tile)
+    return filled, fdir, acc
+
+
+def test_tiled_matches_whole_raster(tmp_path):
+    rng = np.random.default_rng(340)
+    dem = sum(gaussian_filter(rng.normal(size=(300, 300)), s) * s for s in (4, 16))
+    dem = (dem + np.linspace(0, 20, 300) + rng.normal(0, 0.5, dem.shape)).astype(np.float32)
+    dem[:20, :20] = np.nan
+
+    whole = _layers(dem, 300, tmp_path)
+    tiled = _layers(dem, 64, tmp_path)
+
+    np.testing.assert_array_equal(whole[0], tiled[0])
+    np.testing.assert_array_equal(whole[1], tiled[1])
+    np.testing.assert_allclose(whole[2], tiled[2])
+    assert not any(tmp_path.iterdir())  # The scratch labels are removed